@@ -62,7 +62,7 @@ def get_mirror_setup(db: list[dict], row: dict, check_pieces: bool = False) -> d
         try:
             # check cover dependence is the same
             if not extended_pieces_equals(mirror_cover_dependence, 
-                                          setup["Cover Dependence"]):
+                                          setup.patterns("Cover Dependence")):
                 continue
 
             if check_pieces:
@@ -72,7 +72,7 @@ def get_mirror_setup(db: list[dict], row: dict, check_pieces: bool = False) -> d
                         continue
 
                 # check pieces is the same
-                elif not extended_pieces_equals(mirror_pieces, setup["Pieces"]):
+                elif not extended_pieces_equals(mirror_pieces, setup.patterns("Pieces")):
                     continue
         except:
             raise ValueError(f"{row['ID']} or {setup['ID']} ran into an error when " \
@@ -1,12 +1,14 @@
 from fractions import Fraction
-from utils.pieces import sort_queues, extendPieces
+from utils.pieces import sort_queues
+from utils.pattern import compilePattern, iterQueues
+from utils.packed import pack_queue, EMPTY
 
 def add_queue_to_tree(covering_tree: dict, queue: str, fraction: Fraction) -> bool:
     '''
     Adds a queue with its percent to a tree for each queue
 
     Parameters:
-        covering_tree (dict): a tree represented with dict with keys TILJSZO with dicts with TILJSZO down
+        covering_tree (dict): a tree represented with dict of each packed queue in the tree to its chance or None
         queue (str): a queue to be added to the tree
         fraction (fraction): the fraction of the solve chance for that queue
 
@@ -14,43 +16,41 @@ def add_queue_to_tree(covering_tree: dict, queue: str, fraction: Fraction) -> bo
         bool: whether the tree has changed
     '''
        
+    # the nodes are the packed queue without the last pieces
+    packed = pack_queue(queue) if queue else EMPTY
+
     # get the first node (the root)
-    node = covering_tree
+    node = EMPTY
 
-    # index of each piece of the queue
-    queue_index = 0
+    # bits of the pieces of the queue not in the node
+    shift = 3 * len(queue)
 
     # check if the piece is in the current level of the tree
-    while queue_index < len(queue) and queue[queue_index] in node:
+    while shift and (child := packed >> (shift - 3)) in covering_tree:
         # traverse to next level
-        piece = queue[queue_index]
-        node = node[piece]
-        queue_index += 1
+        node = child
+        shift -= 3
     
     # check if this node has a chance associated with it
-    if "chance" in node:
+    if covering_tree.get(node) is not None:
 
         # compare the chance to the chance for this queue
-        if node["chance"] < fraction:
-            node["chance"] = fraction
+        if covering_tree[node] < fraction:
+            covering_tree[node] = fraction
             return True
 
         return False
     
     # not covered already in the tree, add to tree
-    while queue_index < len(queue):
-        piece = queue[queue_index]
-        
-        # create new node
-        node[piece] = {}
+    while shift:
+        shift -= 3
 
-        # traverse to that node
-        node = node[piece]
-
-        queue_index += 1
+        # create new node
+        node = packed >> shift
+        covering_tree[node] = None
     
     # add the chance
-    node["chance"] = fraction
+    covering_tree[node] = fraction
 
     return True
 
@@ -60,7 +60,7 @@ def add_setup_cover_queues(db: list[dict], covering_tree: dict):
 
     Parameters:
         db (list): a list of rows in the format of a dictionary
-        covering_tree (dict): a tree represented with dict with keys TILJSZO with dicts with TILJSZO down
+        covering_tree (dict): a tree represented with dict of each packed queue in the tree to its chance or None
     '''
 
     for line in db:
@@ -75,7 +75,7 @@ def add_setup_cover_queues(db: list[dict], covering_tree: dict):
         percent = Fraction(line["Solve Fraction"])
 
         # get the queues from cover dependence
-        queues = extendPieces(pattern)
+        queues = compilePattern(pattern).queues()
 
         # check if the data just is 1
         if line["Cover Data"] == '1':
@@ -92,13 +92,14 @@ def add_setup_cover_queues(db: list[dict], covering_tree: dict):
                     add_queue_to_tree(covering_tree, queue, percent)
                 bit_str >>= 1
 
-def read_tree_stats(covering_tree: dict, general_pattern: str) -> dict:
+def read_tree_stats(covering_tree: dict, general_pattern: str, workers: int | None = None) -> dict:
     '''
     Calculate various stats from the covering tree and provided queues to covered
 
     Parameters:
-        covering_tree (dict): a tree represented with dict with keys TILJSZO with dicts with TILJSZO down
+        covering_tree (dict): a tree represented with dict of each packed queue in the tree to its chance or None
         general_pattern (str): a pattern for extended pieces that represents all queues to be covered by the setups in db
+        workers (int): number of worker processes to generate the queues in, generated in this process if not given
 
     '''
 
@@ -114,30 +115,29 @@ def read_tree_stats(covering_tree: dict, general_pattern: str) -> dict:
         "Average Percent": 0,
     }
 
-    # get the queues from the pattern
-    queues = extendPieces(general_pattern)
+    # stream the queues from the pattern
+    queues = iterQueues(general_pattern, workers)
 
     # go through each queue
     for queue in queues:
         # current best solve chance
         best_chance = -1
 
-        # index for piece in queue
-        queue_index = 0
+        # the nodes are the packed queue without the last pieces
+        packed = pack_queue(queue)
 
-        # get first node (root)
-        node = covering_tree
+        # bits of the pieces of the queue not in the node
+        shift = 3 * len(queue)
 
         # while can traverse further in the tree
-        while queue_index < len(queue) and queue[queue_index] in node:
+        while shift and (node := packed >> (shift - 3)) in covering_tree:
             # traverse to next level
-            piece = queue[queue_index]
-            node = node[piece]
-            queue_index += 1
+            shift -= 3
 
             # check if a chance is on this tree level and best one so far
-            if "chance" in node and best_chance < node["chance"]:
-                best_chance = node["chance"]
+            chance = covering_tree[node]
+            if chance is not None and best_chance < chance:
+                best_chance = chance
 
         # check if there's no percent for this queue
         if best_chance == -1:
@@ -181,13 +181,14 @@ def read_tree_stats(covering_tree: dict, general_pattern: str) -> dict:
 
     return result_stats
 
-def average_percent(db: list[dict], general_pattern: str) -> dict:
+def average_percent(db: list[dict], general_pattern: str, workers: int | None = None) -> dict:
     '''
     Calculate the average percent of the given database along with other stats of worst percent and their queues and overall cover the setups have
 
     Parameters:
         db (list): a list of rows in the format of a dictionary
         general_pattern (str): a pattern for extended pieces that represents all queues to be covered by the setups in db
+        workers (int): number of worker processes to generate the queues in, generated in this process if not given
 
     Returns:
         dict: a dictionary with the various stats
@@ -198,7 +199,7 @@ def average_percent(db: list[dict], general_pattern: str) -> dict:
 
     add_setup_cover_queues(db, covering_tree)
 
-    return read_tree_stats(covering_tree, general_pattern)
+    return read_tree_stats(covering_tree, general_pattern, workers)
    
 def display_stats(result_stats: dict, display_not_covered: bool = False, display_worst: bool = False):
     '''
@@ -259,12 +260,12 @@ def main():
     '''Main function to handle user input and display output'''
 
     from utils.constants import FILENAMES
-    from utils.fileReader import openFile, queryWhere
+    from utils.fileReader import iterRows
     
     pc_num, where_str, general_pattern, not_covered, worst_queues = user_input()
 
-    db = openFile(FILENAMES[pc_num])
-    db = queryWhere(db, where=where_str)
+    # only the filtered rows are kept
+    db = list(iterRows(FILENAMES[pc_num], where=where_str))
 
     display_stats(average_percent(db, general_pattern), display_not_covered=not_covered, display_worst=worst_queues)
 
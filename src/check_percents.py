@@ -3,8 +3,7 @@ import threading
 import subprocess
 
 from utils.fumen_utils import is_pc, get_height
-from utils.queue_utils import split_extended_pieces
-from utils.pieces import extendPieces
+from utils.pattern import countQueues, writeQueues
 from utils.constants import ROOT, SFINDERPATH, KICKPATH
 
 def calculate_percent_in_range(db: list[dict], line_start: int, line_end: int, thread_num: int = 1, only_empty: bool = False, overwrite: bool = False):
@@ -39,8 +38,12 @@ def calculate_percent_in_range(db: list[dict], line_start: int, line_end: int, t
         if pieces == 'NULL':
             continue
 
-        # split pieces
-        pieces = split_extended_pieces(pieces)
+        # compiled pattern of each page
+        try:
+            pieces = line.patterns("Pieces")
+        except Exception:
+            print(f"{line_num}: Couldn't process pieces '{pieces}'")
+            continue
         
         # store the numerator and denominator
         numerator = 0 
@@ -50,14 +53,10 @@ def calculate_percent_in_range(db: list[dict], line_start: int, line_end: int, t
         # run pieces for each page of the setup
         for page, pattern in enumerate(pieces):
             try: 
-                # get the queues for this patten
-                queues = extendPieces(pattern)
-
-
-                # put the queues into a patterns file
+                # put the queues for this patten into a patterns file
                 pattern_filepath = os.path.join(ROOT, "src", "input", f"patterns_{thread_num}.txt")
                 with open(pattern_filepath, "w") as infile:
-                    infile.write("\n".join(queues))
+                    num_queues = writeQueues(pattern, infile)
     
                 # run the percent and get the output
                 percent_cmd = f"java -jar {SFINDERPATH} percent -t {setup} -pp {pattern_filepath} -P {page + 1} -d 180 -K {KICKPATH} -c {clear_line}".split()
@@ -105,6 +104,10 @@ def calculate_percent_in_range(db: list[dict], line_start: int, line_end: int, t
                 print(f"{line_num}: Couldn't find percent")
                 error = True
                 break
+
+            # sfinder should have run every queue of the pattern
+            if denominator != num_queues:
+                print(f"{line_num}: denominator {denominator} differs from the {num_queues} queues of '{pattern}'")
        
         # if there was an error with this line skip it
         if error:
@@ -121,7 +124,7 @@ def calculate_percent_in_range(db: list[dict], line_start: int, line_end: int, t
         if calc_percent != percent:
             # warn the user this is the case
             print(f'{line_num}: percent is calculated to be {calc_percent} instead of {percent}')
-            print(f"extendedPieces '{';'.join(pieces)}' > input/patterns.txt; " + f"java -jar sfinder.jar percent -t {setup} -d 180")
+            print(f"extendedPieces '{';'.join(map(str, pieces))}' > input/patterns.txt; " + f"java -jar sfinder.jar percent -t {setup} -d 180")
 
         if overwrite:
             # write into the db
@@ -131,6 +134,44 @@ def calculate_percent_in_range(db: list[dict], line_start: int, line_end: int, t
     
     print(f'Thread {thread_num} finished')
     
+def check_denominators(db: list[dict], print_error: bool = True) -> list[dict]:
+    '''
+    Check the denominator of the solve fraction is the number of queues of the patterns of every page of the pieces
+
+    Parameters:
+        db (list): a list of rows in the format of a dictionary
+        print_error (bool): whether to print errors out
+
+    Return:
+        list[dict]: rows that have issues
+    '''
+
+    result = []
+
+    for row in db:
+        # rows without a percent to check
+        if row["Pieces"] in ("NULL", None) or row["Solve Fraction"] in ("NULL", "", None):
+            continue
+
+        # the fraction is the total over every page
+        pieces = row["Pieces"]
+        denominator = int(row["Solve Fraction"].split("/")[1])
+
+        try:
+            num_queues = sum(map(countQueues, row.patterns("Pieces")))
+        except Exception:
+            if print_error:
+                print(f"{row['ID']} has pieces '{pieces}' that couldn't be processed")
+            result.append(row)
+            continue
+
+        if denominator != num_queues:
+            if print_error:
+                print(f"{row['ID']} has denominator {denominator} but '{pieces}' has {num_queues} queues")
+            result.append(row)
+
+    return result
+
 def check_percents(db: list[dict], start_line: int = 1, threads: int = 4, overwrite: bool = False, only_empty: bool = False) -> None:
     '''
     Calculate the percents for all setups in db
@@ -174,6 +215,8 @@ if __name__ == "__main__":
 
     db = openFile("output/cover_data.tsv")
 
+    check_denominators(db)
+
     check_percents(db, threads=1, overwrite=True, only_empty=True)
 
     outfile = open(f"output/check_percents.tsv", "w")
@@ -3,8 +3,8 @@ from csv import reader
 from os import path
 
 from utils.constants import ROOT, SFINDERPATH, KICKPATH
-from utils.pieces import extendPieces
-from utils.fileReader import queryWhere
+from utils.pattern import writeQueues
+from utils.fileReader import compileWhere
 from utils.disassemble import disassemble
 
 PATTERNSPATH = path.join(ROOT, "src", "input", "patterns.txt")
@@ -45,12 +45,14 @@ def get_order_of_setups(row: dict, db: list[dict]) -> list[str]:
     # add to setups
     setups.append(fumen)
 
+    id_where = compileWhere("ID=?")
+
     # go through the previous setups
     while previous_setup_id:
         
         try:
             # find the row that had the previous setup id
-            row = queryWhere(db, where=f"ID={previous_setup_id}")[0]
+            row = id_where.query(db, previous_setup_id)[0]
         except:
             # error
             raise ValueError(f"The previous setup {previous_setup_id} was not found")
@@ -90,16 +92,17 @@ def get_cover_data(db: list[dict], overwrite: bool = False) -> list[dict]:
         # get the dependency
         pattern = row["Cover Dependence"]
 
-        # get the queues from the pattern
+        # write the queues from the pattern into the patterns file
         try:
-            queues = list(extendPieces(pattern))
+            with open(PATTERNSPATH, "w") as infile:
+                num_queues = writeQueues(pattern, infile)
         except:
             # error
             print(f"Unable to process '{pattern}' for id '{row['ID']}'")
             continue
 
         # no queues were outputted
-        if len(queues) == 0:
+        if num_queues == 0:
             print(f"{row['ID']} cover dependence returned no queues")
             continue
 
@@ -109,10 +112,6 @@ def get_cover_data(db: list[dict], overwrite: bool = False) -> list[dict]:
         # output bit string
         bitstr = ""
         
-        # write the queues into the patterns file
-        with open(PATTERNSPATH, "w") as infile:
-            infile.write("\n".join(queues))
-        
         # get the glue fumen verison of the setups
         glue_fumens = disassemble(setups, print_error=False) 
         
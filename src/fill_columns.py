@@ -1,9 +1,9 @@
 # Fill out the rest of the columns and verify columns are reasonable
 
-from utils.constants import FILENAMES, BUILDDELIMITOR, PIECESDELIMITOR
-from utils.fileReader import queryWhere, openFile
+from utils.constants import BUILDDELIMITOR, PIECESDELIMITOR
+from utils.catalog import openTable
 from utils.formulas import LONUM2PCNUM, LONUM2BAGCOMP
-from utils.queue_utils import BAG, PIECEVALS, sort_queue, extended_pieces_equals
+from utils.queue_utils import BAG, PIECEVALS, sort_queue, extended_pieces_equals, compile_extended_pieces
 from utils.fumen_utils import is_pc
 from simple_checks import duplicate_rows, generate_build, sort_db
 from collections import Counter
@@ -15,7 +15,96 @@ NUMPIECESINPC = 10
 HOLD = 1
 SEE = 7
 
-def generate_id(row: dict, input_db: list[dict]) -> str:
+# length of the part of the id encoding the setup before the unique id
+IDPREFIXLEN = 8
+
+# ids in the full format, others aren't indexed by the id allocator
+IDREGEX = re.compile(f"[0-9A-F]{{{IDLEN}}}")
+
+class IDAllocator:
+    '''
+    Index of the unique ids used under each id prefix by the rows being filled and the known database
+
+    The ids of the rows being filled are updated with update as they're assigned,
+    the rows of the known database are indexed once per table.
+    '''
+
+    def __init__(self, input_db: list[dict] = ()):
+        # prefix to counts of the unique ids used by the rows being filled
+        self._input_ids: dict[str, Counter] = {}
+
+        # rows being filled to the id they're indexed under
+        self._row_ids: dict[int, str] = {}
+
+        # pc number to the known table and its rows by prefix
+        self._known: dict[int, tuple[list[dict], dict[str, list[dict]]]] = {}
+
+        for row in input_db:
+            self.update(row)
+
+    def update(self, row: dict) -> None:
+        '''
+        Index the current id of the row being filled, replacing the id it was indexed under
+
+        Parameters:
+            row (dict): row being filled
+        '''
+
+        old_id = self._row_ids.pop(id(row), None)
+        if old_id is not None:
+            counts = self._input_ids[old_id[:IDPREFIXLEN]]
+            counts[old_id[IDPREFIXLEN:]] -= 1
+            if not counts[old_id[IDPREFIXLEN:]]:
+                del counts[old_id[IDPREFIXLEN:]]
+
+        new_id = row["ID"]
+        if new_id and IDREGEX.fullmatch(new_id):
+            self._row_ids[id(row)] = new_id
+            self._input_ids.setdefault(new_id[:IDPREFIXLEN], Counter())[new_id[IDPREFIXLEN:]] += 1
+
+    def known_rows(self, pc_num: int, prefix: str) -> list[dict]:
+        '''
+        Get the rows of the known database of the pc with ids under the prefix
+
+        Parameters:
+            pc_num (int): pc number of the known database
+            prefix (str): first IDPREFIXLEN hexdigits of an id
+
+        Return:
+            list[dict]: rows in the order of the database
+        '''
+
+        known_db = openTable(pc_num)
+
+        # index the table again if it was reloaded
+        if pc_num not in self._known or self._known[pc_num][0] is not known_db:
+            prefix_rows = {}
+            for known_row in known_db:
+                if IDREGEX.fullmatch(known_row["ID"]):
+                    prefix_rows.setdefault(known_row["ID"][:IDPREFIXLEN], []).append(known_row)
+
+            self._known[pc_num] = (known_db, prefix_rows)
+
+        return self._known[pc_num][1].get(prefix, [])
+
+    def used_unique_ids(self, pc_num: int, prefix: str) -> list[int]:
+        '''
+        Get the unique ids used under the prefix by the rows being filled and the known database
+
+        Parameters:
+            pc_num (int): pc number of the known database
+            prefix (str): first IDPREFIXLEN hexdigits of an id
+
+        Return:
+            list[int]: the unique ids used
+        '''
+
+        found_unique_ids = [int(unique_id, 16) for unique_id in self._input_ids.get(prefix, ())]
+        found_unique_ids += [int(x["ID"][-2:], 16) for x in self.known_rows(pc_num, prefix)]
+
+        return found_unique_ids
+
+def generate_id(row: dict, input_db: list[dict], allocator: IDAllocator | None = None) -> str:
     '''
     Generate an id for a given row
 
@@ -25,6 +114,8 @@ def generate_id(row: dict, input_db: list[dict]) -> str:
 
     Parameters:
         row (dict): row in database
+        input_db (list): rows being filled that the id can't collide with
+        allocator (IDAllocator): index of the used ids of input_db, built from input_db if not given
 
     Return:
         hexadecimal id for that setup
@@ -82,22 +173,12 @@ def generate_id(row: dict, input_db: list[dict]) -> str:
     hex_id = '%.*X' % (IDLEN, int(binary_id, 2))
 
     # find the correct unique id
-    found_unique_ids: list[int]
-
-    input_db_copy: list[dict] = input_db[:]
-    sort_db(input_db_copy)
+    if allocator is None:
+        allocator = IDAllocator(input_db)
 
-    input_filtered_db: list[dict] = queryWhere(input_db_copy, where=f"ID<>")
-    input_filtered_db = queryWhere(input_filtered_db, where=f"ID<={hex_id}")
-    input_filtered_db = queryWhere(input_filtered_db, where=f"ID>={hex_id[:8] + "00"}")
+    found_unique_ids: list[int] = allocator.used_unique_ids(pc_num, hex_id[:IDPREFIXLEN])
 
-    found_unique_ids = [int(x["ID"][-2:],16) for x in input_filtered_db]
-
-    known_db: list[dict] = openFile(FILENAMES[pc_num])
-    filtered_db: list[dict] = queryWhere(known_db, where=f"ID<={hex_id}")
-    filtered_db = queryWhere(filtered_db, where=f"ID>={hex_id[:8] + "00"}")
-
-    found_unique_ids += [int(x["ID"][-2:], 16) for x in filtered_db]
+    filtered_db: list[dict] = allocator.known_rows(pc_num, hex_id[:IDPREFIXLEN])
 
     # non empty, if empty is new id
     if found_unique_ids:
@@ -405,6 +486,8 @@ def fill_columns(db: list[dict], print_disprepancy: bool = True, overwrite: bool
             else:
                 row[key] = new
 
+    allocator = IDAllocator(db)
+
     for row in db:
         # check if the necessary columns are filled
         if not (row["Leftover"] and row["Setup"]):
@@ -417,10 +500,11 @@ def fill_columns(db: list[dict], print_disprepancy: bool = True, overwrite: bool
         update(row, "Build", generate_build)
 
         # fill id
-        update(row, "ID", lambda x: generate_id(x, db))
+        update(row, "ID", lambda x: generate_id(x, db, allocator))
+        allocator.update(row)
 
         if overwrite_equivalent:
-            equal_pieces = extended_pieces_equals
+            equal_pieces = lambda x,y: extended_pieces_equals(compile_extended_pieces(x), compile_extended_pieces(y))
         else:
             equal_pieces = lambda x,y: x == y
 
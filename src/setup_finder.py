@@ -12,12 +12,12 @@
 #
 
 # imports
-from utils.constants import FILENAMES
 from utils.fumen_utils import get_field
 from utils.queue_utils import sort_queue
 from utils.inverse_pieces import matching_queue
 from utils.formulas import PCNUM2LONUM
-from utils.fileReader import queryWhere, openFile
+from utils.fileReader import queryWhere
+from utils.catalog import openTable
 
 from collections import Counter
 
@@ -52,16 +52,13 @@ def setupFinder(pcNum: int, queue: str, previousSetup: str = "") -> list[dict]:
     queue = queue.upper()
 
     foundSetups = []
-    rows = openFile(FILENAMES[pcNum])
+    rows = openTable(pcNum)
 
     # get leftover pieces sorted
     leftover = sort_queue(queue[:PCNUM2LONUM(pcNum)])
 
-    # get the rows where the leftover matches
-    rows = queryWhere(rows, where=f"Leftover={leftover}")
-
-    # filter for the previous setup
-    rows = queryWhere(rows, where=f"Previous Setup={previousSetup}")
+    # get the rows where the leftover and previous setup matches
+    rows = queryWhere(rows, where=f"Leftover={leftover} AND Previous Setup={previousSetup}")
 
     # go through the rows
     for row in rows:
@@ -71,7 +68,7 @@ def setupFinder(pcNum: int, queue: str, previousSetup: str = "") -> list[dict]:
         if not Counter(row["Build"]) <= Counter(queue[:len(row["Build"]) + 1]):
             continue
 
-        index = matching_queue(queue, row["Cover Dependence"], equality=lambda x, y: y.startswith(x))
+        index = matching_queue(queue, row["Cover Dependence"], prefix=True)
 
         if index == -1:
             continue
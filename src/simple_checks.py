@@ -1,6 +1,6 @@
 # some basic checks
 
-from utils.fileReader import queryWhere
+from utils.fileReader import queryWhere, compileWhere
 from utils.queue_utils import extended_pieces_equals, extended_pieces_startswith, sort_queue
 from utils.fumen_utils import permutated_equals, get_pieces
 from utils.constants import PREVSETUPDELIMITOR, NEXTSETUPDELIMITOR, BUILDDELIMITOR
@@ -84,8 +84,11 @@ def duplicate_rows(db: list[dict], check_pieces: bool = False) -> list[list[str]
                 if not same_fumen:
                     continue
 
-                # check cover dependence
-                same_cover_dependence = extended_pieces_equals(row1["Cover Dependence"], row2["Cover Dependence"])
+                # check cover dependence, the same value is the same even if it's NULL
+                same_cover_dependence = (
+                    row1["Cover Dependence"] == row2["Cover Dependence"]
+                    or extended_pieces_equals(row1.patterns("Cover Dependence"), row2.patterns("Cover Dependence"))
+                )
 
                 if not same_cover_dependence:
                     continue
@@ -99,7 +102,7 @@ def duplicate_rows(db: list[dict], check_pieces: bool = False) -> list[list[str]
                     if row1_null or row2_null:
                         same_pieces = row1_null and row2_null
                     else:
-                        same_pieces = extended_pieces_equals(row1["Pieces"], row2["Pieces"])
+                        same_pieces = extended_pieces_equals(row1.patterns("Pieces"), row2.patterns("Pieces"))
 
                 # if they have same cover dependence and same pieces (if relavent)
                 if not check_pieces or same_pieces:
@@ -171,6 +174,8 @@ def check_oqb(db: list[dict], print_error: bool = True) -> list[list[dict]]:
 
     result = []
 
+    id_where = compileWhere("ID=?")
+
     # query for setups that have next setup
     previous_setup_rows = queryWhere(db, "Previous Setup<>")
     next_setup_rows = queryWhere(db, "Next Setup<>")
@@ -184,11 +189,11 @@ def check_oqb(db: list[dict], print_error: bool = True) -> list[list[dict]]:
         issue_rows = [row]
 
         for id in next_setups_id:
-            next_setup = queryWhere(db, f"ID={id}")[0]
+            next_setup = id_where.query(db, id)[0]
             issue = False
 
             # check if this setup starts with the cover dependence from the previous setup
-            if not extended_pieces_startswith(cover_dependence, next_setup["Cover Dependence"]):
+            if not extended_pieces_startswith(row.patterns("Cover Dependence"), next_setup.patterns("Cover Dependence")):
                 if print_error:
                     print(f"{prev_id} -> {id} have different cover dependence: {cover_dependence} -> {next_setup['Cover Dependence']}")
                 
@@ -210,7 +215,7 @@ def check_oqb(db: list[dict], print_error: bool = True) -> list[list[dict]]:
     # check if the each previous setup has the same next setup
     for row in previous_setup_rows:
         prev_id = row["Previous Setup"]
-        prev_setup = queryWhere(db, f"ID={prev_id}")[0]
+        prev_setup = id_where.query(db, prev_id)[0]
 
         if row["ID"] not in prev_setup["Next Setup"].split(PREVSETUPDELIMITOR):
             if print_error:
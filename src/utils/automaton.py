@@ -0,0 +1,154 @@
+# Deterministic automaton over the pieces deciding if a queue is in a compiled pattern
+
+import threading
+from typing import Hashable, Protocol, Iterable
+from .pieces import BAG
+
+class AutomatonNode(Protocol):
+    '''
+    Node of a compiled pattern as a nondeterministic automaton
+
+    States are any hashable values local to the node
+    '''
+
+    def startStates(self) -> Iterable[Hashable]:
+        '''States of the node before reading any piece'''
+
+    def step(self, state: Hashable, piece: str) -> Iterable[Hashable]:
+        '''States of the node after reading the piece in the state'''
+
+    def accepts(self, state: Hashable) -> bool:
+        '''Whether the pieces read to reach the state make a queue of the node'''
+
+class Automaton:
+    '''
+    Deterministic automaton of a compiled pattern built lazily as queues are read
+
+    Each state is the set of states of the node reachable by the pieces read so far.
+    A state and its transitions are built the first time they're reached and kept,
+    so reading a queue takes time linear in its length once the states it goes through are built.
+
+    Attributes:
+        node (AutomatonNode): root node of the pattern
+        start (int): the state before reading any piece
+    '''
+
+    # the state with no states of the node, no queue can be accepted from it
+    DEAD = 0
+
+    def __init__(self, node: AutomatonNode):
+        self.node = node
+
+        self._ids: dict[frozenset, int] = {}
+        self._states: list[frozenset] = []
+        self._transitions: list[dict[str, int]] = []
+        self._accepting: list[bool] = []
+        self._lock = threading.Lock()
+
+        self._stateId(frozenset())
+        self.start = self._stateId(frozenset(node.startStates()))
+
+    def __len__(self) -> int:
+        '''Number of states built so far'''
+
+        return len(self._states)
+
+    def _stateId(self, states: frozenset) -> int:
+        '''
+        Get the id of the state with the set of states of the node, adding it if new
+
+        Parameters:
+            states (frozenset): states of the node
+
+        Return:
+            int: id of the state
+        '''
+
+        state_id = self._ids.get(states)
+        if state_id is None:
+            state_id = len(self._states)
+
+            self._states.append(states)
+            self._transitions.append({})
+            self._accepting.append(any(map(self.node.accepts, states)))
+            self._ids[states] = state_id
+
+        return state_id
+
+    def next(self, state_id: int, piece: str) -> int:
+        '''
+        Get the state after reading the piece
+
+        Parameters:
+            state_id (int): id of the current state
+            piece (str): the piece read
+
+        Return:
+            int: id of the next state
+        '''
+
+        next_id = self._transitions[state_id].get(piece)
+        if next_id is not None:
+            return next_id
+
+        with self._lock:
+            next_id = self._transitions[state_id].get(piece)
+            if next_id is None:
+                if piece in BAG:
+                    next_states = frozenset(
+                        next_state for state in self._states[state_id] for next_state in self.node.step(state, piece)
+                    )
+                else:
+                    next_states = frozenset()
+
+                next_id = self._transitions[state_id][piece] = self._stateId(next_states)
+
+        return next_id
+
+    def accepting(self, state_id: int) -> bool:
+        '''Whether the state is reached by a queue of the pattern'''
+
+        return self._accepting[state_id]
+
+    def matches(self, queue: str) -> bool:
+        '''
+        Check if the queue is a queue of the pattern
+
+        Parameters:
+            queue (str): a tetris format queue
+
+        Return:
+            bool: whether the queue is in the pattern
+        '''
+
+        state_id = self.start
+        for piece in queue:
+            state_id = self.next(state_id, piece)
+
+            if state_id == self.DEAD:
+                return False
+
+        return self._accepting[state_id]
+
+    def matchesPrefix(self, queue: str) -> bool:
+        '''
+        Check if the queue starts with a queue of the pattern
+
+        Parameters:
+            queue (str): a tetris format queue
+
+        Return:
+            bool: whether the queue or a prefix of it is in the pattern
+        '''
+
+        state_id = self.start
+        for piece in queue:
+            if self._accepting[state_id]:
+                return True
+
+            state_id = self.next(state_id, piece)
+
+            if state_id == self.DEAD:
+                return False
+
+        return self._accepting[state_id]
@@ -0,0 +1,122 @@
+# Catalog of the tables of every pc shared by the whole process
+
+import os
+import threading
+from .constants import FILENAMES
+from .fileReader import openStore, COL2KEY
+from .table import ReadOnlyTable
+
+# columns the indexes are built for when a table is loaded
+INDEXEDCOLUMNS = ["ID", "Leftover", "Previous Setup"]
+
+class Catalog:
+    '''
+    Read only tables of the database files loaded once and kept with their indexes
+
+    A table is loaded again only when its file changes.
+
+    Attributes:
+        filenames (dict): pc number to the filepath of its database file
+    '''
+
+    def __init__(self, filenames: dict[int, str] = FILENAMES):
+        self.filenames = filenames
+        self._tables: dict[int, tuple[tuple[int, int], ReadOnlyTable]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, pc_num: int) -> tuple[tuple[int, int], ReadOnlyTable]:
+        '''
+        Load the table of the pc with its indexes built
+
+        Parameters:
+            pc_num (int): pc number of the table
+
+        Return:
+            tuple: modification time in ns and size of the file and the table
+        '''
+
+        filepath = self.filenames[pc_num]
+
+        # stamp before reading so a change during the read reloads on the next access
+        stat = os.stat(filepath)
+        table = ReadOnlyTable.fromStore(openStore(filepath))
+
+        for column in INDEXEDCOLUMNS:
+            if column in table.store.data:
+                table.hashIndex(column)
+                if column in COL2KEY:
+                    table.sortedIndex(column, COL2KEY[column])
+
+        return (stat.st_mtime_ns, stat.st_size), table
+
+    def loadAll(self) -> None:
+        '''Load every table that isn't loaded or whose file changed'''
+
+        with self._lock:
+            for pc_num in self.filenames:
+                if not self._isCurrent(pc_num):
+                    self._tables[pc_num] = self._load(pc_num)
+
+    def _isCurrent(self, pc_num: int) -> bool:
+        if pc_num not in self._tables:
+            return False
+
+        stat = os.stat(self.filenames[pc_num])
+        return self._tables[pc_num][0] == (stat.st_mtime_ns, stat.st_size)
+
+    def table(self, pc_num: int) -> ReadOnlyTable:
+        '''
+        Get the read only table of the pc, loading every table on first use
+
+        Parameters:
+            pc_num (int): pc number of the table
+
+        Return:
+            ReadOnlyTable: rows of the database file of the pc
+        '''
+
+        if not self._tables:
+            self.loadAll()
+
+        if not self._isCurrent(pc_num):
+            with self._lock:
+                if not self._isCurrent(pc_num):
+                    self._tables[pc_num] = self._load(pc_num)
+
+        return self._tables[pc_num][1]
+
+    __getitem__ = table
+
+# catalog of the tables in FILENAMES
+_CATALOG: Catalog | None = None
+_CATALOGLOCK = threading.Lock()
+
+def getCatalog() -> Catalog:
+    '''
+    Get the catalog of the tables in FILENAMES shared by the process
+
+    Return:
+        Catalog: the shared catalog
+    '''
+
+    global _CATALOG
+
+    if _CATALOG is None:
+        with _CATALOGLOCK:
+            if _CATALOG is None:
+                _CATALOG = Catalog()
+
+    return _CATALOG
+
+def openTable(pc_num: int) -> ReadOnlyTable:
+    '''
+    Get the shared read only table of the pc
+
+    Parameters:
+        pc_num (int): An integer 1-8 representing the pc number
+
+    Return:
+        ReadOnlyTable: rows of the database file of the pc
+    '''
+
+    return getCatalog().table(pc_num)
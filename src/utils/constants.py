@@ -23,6 +23,9 @@ FILENAMES = {
     8: os.path.join(ROOT, "tsv", "8thPC.tsv"),
 }
 
+# path of the sqlite database the tsv files are imported into
+DBPATH = os.path.join(ROOT, "tsv", "PCs.db")
+
 BUILDDELIMITOR = ":"
 PREVSETUPDELIMITOR = ":"
 NEXTSETUPDELIMITOR = ":"
@@ -0,0 +1,378 @@
+# SQLite backend for the tsv database files
+
+import os
+import csv
+import sqlite3
+import threading
+from pathlib import Path
+from .constants import DBPATH
+from .table import Table, ColumnStore
+
+# version of the layout of the tables in the database, bump when the layout changes
+SCHEMAVERSION = 1
+
+# columns added to every table next to the columns of the file
+POSITIONCOLUMN = "_position"
+LEFTOVERKEYCOLUMN = "_leftover_key"
+
+# columns of the file with an index
+INDEXEDCOLUMNS = ["ID", "Leftover", "Previous Setup"]
+
+# table recording the state of each file when it was imported
+SOURCESTABLE = "_sources"
+
+# read only connections of each thread keyed by database path
+_CONNECTIONS = threading.local()
+
+# serializes the imports within the process, sqlite serializes across processes
+_IMPORTLOCK = threading.Lock()
+
+def quoteName(name: str) -> str:
+    '''
+    Quote a table or column name for use in a sql statement
+
+    Parameters:
+        name (str): name of a table or column
+
+    Return:
+        str: the quoted name
+    '''
+
+    return '"' + name.replace('"', '""') + '"'
+
+def tableName(filepath: str) -> str:
+    '''
+    Name of the table for a tsv database file
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+
+    Return:
+        str: name of the table, the filename without the extension
+    '''
+
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+def _writeConnection(db_path: str) -> sqlite3.Connection:
+    '''
+    Open a connection to write to the database in write-ahead logging mode so readers aren't blocked
+
+    Parameters:
+        db_path (str): path of the database
+
+    Return:
+        sqlite3.Connection: connection handling its own transactions
+    '''
+
+    connection = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+
+    return connection
+
+def readConnection(db_path: str = DBPATH) -> sqlite3.Connection:
+    '''
+    Get the read only connection of the current thread to the database
+
+    Parameters:
+        db_path (str): path of the database
+
+    Return:
+        sqlite3.Connection: read only connection reused by the thread
+    '''
+
+    connections = getattr(_CONNECTIONS, "connections", None)
+    if connections is None:
+        connections = _CONNECTIONS.connections = {}
+
+    connection = connections.get(db_path)
+    if connection is None:
+        uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        connection = connections[db_path] = sqlite3.connect(uri, uri=True, timeout=30)
+
+    return connection
+
+def _stamp(filepath: str) -> tuple[int, int]:
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+def _importedStamp(connection: sqlite3.Connection, name: str) -> tuple[int, int] | None:
+    '''
+    State of the file when it was imported into the database
+
+    Parameters:
+        connection (sqlite3.Connection): connection to the database
+        name (str): name of the table of the file
+
+    Return:
+        tuple | None: modification time in ns and size of the file or None if it isn't imported
+    '''
+
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMAVERSION:
+        return None
+
+    try:
+        stamp = connection.execute(
+            f"SELECT mtime_ns, size FROM {SOURCESTABLE} WHERE name = ?", (name,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+
+    return tuple(stamp) if stamp is not None else None
+
+def importTsv(filepath: str, db_path: str = DBPATH) -> None:
+    '''
+    Import the tsv file into its table in the database, replacing the previous import
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+        db_path (str): path of the database
+    '''
+
+    from .fileReader import readTsv, leftoverKey, LEFTOVERKEYLEN
+
+    name = tableName(filepath)
+    stamp = _stamp(filepath)
+    columns, rows = readTsv(filepath)
+
+    if LEFTOVERKEYCOLUMN in columns or POSITIONCOLUMN in columns:
+        raise ValueError(f"File '{filepath}' has a column reserved by the database")
+
+    leftover_index = columns.index("Leftover") if "Leftover" in columns else None
+
+    values = []
+    for position, row in enumerate(rows):
+        # pad the rows so every row has a value for every column
+        row = row[:len(columns)] + [None] * (len(columns) - len(row))
+
+        leftover = row[leftover_index] if leftover_index is not None else None
+        key = leftoverKey(leftover) if leftover is not None and len(leftover) <= LEFTOVERKEYLEN else None
+
+        values.append((position, key, *row))
+
+    table = quoteName(name)
+    column_defs = ", ".join(f"{quoteName(column)} TEXT" for column in columns)
+
+    with _IMPORTLOCK:
+        connection = _writeConnection(db_path)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+
+            # a layout change makes every import stale
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMAVERSION:
+                connection.execute(f"DROP TABLE IF EXISTS {SOURCESTABLE}")
+                connection.execute(f"PRAGMA user_version = {SCHEMAVERSION}")
+
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {SOURCESTABLE} (name TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER)"
+            )
+
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+            connection.execute(
+                f"CREATE TABLE {table} ({POSITIONCOLUMN} INTEGER PRIMARY KEY, {LEFTOVERKEYCOLUMN} INTEGER, {column_defs})"
+            )
+
+            placeholders = ", ".join("?" * (len(columns) + 2))
+            connection.executemany(f"INSERT INTO {table} VALUES ({placeholders})", values)
+
+            # indexes after the inserts so they're built once
+            for column in INDEXEDCOLUMNS:
+                if column in columns:
+                    connection.execute(
+                        f"CREATE INDEX {quoteName(f'{name} {column}')} ON {table} ({quoteName(column)})"
+                    )
+            connection.execute(
+                f"CREATE INDEX {quoteName(f'{name} {LEFTOVERKEYCOLUMN}')} ON {table} ({LEFTOVERKEYCOLUMN})"
+            )
+
+            connection.execute(
+                f"INSERT OR REPLACE INTO {SOURCESTABLE} VALUES (?, ?, ?)", (name, *stamp)
+            )
+            connection.execute("COMMIT")
+            connection.execute("ANALYZE")
+
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+        finally:
+            connection.close()
+
+def ensureImported(filepath: str, db_path: str = DBPATH) -> None:
+    '''
+    Import the tsv file if the database doesn't have the current content of the file
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+        db_path (str): path of the database
+    '''
+
+    if os.path.exists(db_path):
+        if _importedStamp(readConnection(db_path), tableName(filepath)) == _stamp(filepath):
+            return
+
+    importTsv(filepath, db_path)
+
+def exportTsv(filepath: str, outpath: str | None = None, db_path: str = DBPATH) -> None:
+    '''
+    Write the table of the tsv file from the database back in the tsv format
+
+    Parameters:
+        filepath (str): the filepath of the tsv database file the table was imported from
+        outpath (str): the filepath to write to, the file itself if not given
+        db_path (str): path of the database
+    '''
+
+    if outpath is None:
+        outpath = filepath
+
+    columns, rows = SqlTable(filepath, db_path).select()
+
+    with open(outpath, "w", newline="") as outfile:
+        writer = csv.writer(outfile, delimiter="\t")
+
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+def whereToSql(where: str) -> tuple[str, list]:
+    '''
+    Translate a where expression into a sql condition with parameters
+
+    Parameters:
+        where (str): expression of conditions in format column operator value joined by AND and OR
+
+    Return:
+        tuple[str, list]: sql condition with ? placeholders and the values of the placeholders
+    '''
+
+    from .fileReader import parseWhere, leftoverKey, COL2KEY
+
+    params = []
+    clauses_sql = []
+    for conditions in parseWhere(where):
+        conditions_sql = []
+
+        for column, op, value in conditions:
+            column_sql = quoteName(column)
+
+            # <> also selects missing values like the tsv files
+            if op == "=":
+                conditions_sql.append(f"{column_sql} = ?")
+            elif op == "<>":
+                conditions_sql.append(f"{column_sql} IS NOT ?")
+
+            # ranges need an ordering on the column
+            elif column not in COL2KEY:
+                raise ValueError(f"Got an invalid operator for column without ordering '{op}'")
+
+            elif COL2KEY[column] is None:
+                conditions_sql.append(f"{column_sql} {op} ?")
+
+            else:
+                # compare by the sort key stored next to the column
+                conditions_sql.append(f"{LEFTOVERKEYCOLUMN} {op} ?")
+                value = leftoverKey(value)
+
+            params.append(value)
+
+        clauses_sql.append("(" + " AND ".join(conditions_sql) + ")")
+
+    return " OR ".join(clauses_sql), params
+
+class SqlTable:
+    '''
+    Table of a tsv database file in the database
+
+    Queries run in the database and only the selected rows are read.
+    Reading the rows as a whole loads a Table of all rows once.
+
+    Attributes:
+        filepath (str): the filepath of the tsv database file
+        name (str): name of the table in the database
+        db_path (str): path of the database
+    '''
+
+    def __init__(self, filepath: str, db_path: str = DBPATH):
+        self.filepath = filepath
+        self.name = tableName(filepath)
+        self.db_path = db_path
+        self._rows: Table | None = None
+
+    def columns(self) -> list[str]:
+        '''Names of the columns of the file in order'''
+
+        cursor = readConnection(self.db_path).execute(f"SELECT * FROM {quoteName(self.name)} LIMIT 0")
+
+        return [description[0] for description in cursor.description[2:]]
+
+    def select(self, where: str = "") -> tuple[list[str], list[tuple]]:
+        '''
+        Get the values of the rows satisfying the where expression in file order
+
+        Parameters:
+            where (str): expression of conditions in format column operator value joined by AND and OR
+
+        Return:
+            tuple[list[str], list[tuple]]: names of the columns and values of each row
+        '''
+
+        columns = self.columns()
+        query = f"SELECT {', '.join(map(quoteName, columns))} FROM {quoteName(self.name)}"
+
+        params = []
+        if where:
+            condition, params = whereToSql(where)
+            query += f" WHERE {condition}"
+
+        query += f" ORDER BY {POSITIONCOLUMN}"
+
+        return columns, readConnection(self.db_path).execute(query, params).fetchall()
+
+    def query(self, where: str = "") -> Table:
+        '''
+        Get the rows satisfying the where expression
+
+        Parameters:
+            where (str): expression of conditions in format column operator value joined by AND and OR
+
+        Return:
+            Table: the selected rows
+        '''
+
+        return Table.fromStore(ColumnStore.fromValues(*self.select(where)))
+
+    def rows(self) -> Table:
+        '''All rows of the table, loaded on first use'''
+
+        if self._rows is None:
+            self._rows = self.query()
+
+        return self._rows
+
+    def __len__(self) -> int:
+        if self._rows is not None:
+            return len(self._rows)
+
+        return readConnection(self.db_path).execute(f"SELECT COUNT(*) FROM {quoteName(self.name)}").fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __getitem__(self, index):
+        return self.rows()[index]
+
+def openSqlTable(filepath: str, db_path: str = DBPATH) -> SqlTable:
+    '''
+    Get the table of the tsv file from the database, importing the file first if it changed
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+        db_path (str): path of the database
+
+    Return:
+        SqlTable: the table of the file
+    '''
+
+    ensureImported(filepath, db_path)
+
+    return SqlTable(filepath, db_path)
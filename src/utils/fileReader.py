@@ -1,15 +1,104 @@
 # Quasi SQL program with just select, from, and where using tsv files
 
+import os
 import re
+import operator
+import pickle
+import hashlib
 from typing import Callable
-from csv import DictReader
+from csv import reader
 from bisect import bisect_left, bisect_right
-from functools import cmp_to_key
-from typing import Any
+from functools import cmp_to_key, cache, lru_cache
+from typing import Any, Iterator
+from .table import Table, ColumnStore
+from .database import SqlTable, openSqlTable
+
+# version of the on disk snapshot of a parsed file, bump when the format changes
+CACHEVERSION = 2
+
+# parsed files already loaded in this process keyed by filepath
+_OPENEDFILES: dict[str, tuple[tuple[int, int], ColumnStore]] = {}
+
+# operators of a where expression, ones sharing a prefix first
+OPERATORS = ["<>", ">=", "<=", "<", ">", "="]
+
+# splits a condition of a where expression around its operator
+OPERATORREGEX = re.compile(f"({'|'.join(OPERATORS)})")
+
+# keywords joining the parts of a where expression, AND binds tighter than OR
+ANDKEYWORD = " AND "
+ORKEYWORD = " OR "
+
+# functions for the operators when comparing a value to another
+OP2FUNC = {
+    "<>": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "<": operator.lt,
+    ">": operator.gt,
+    "=": operator.eq,
+}
+
+# value in a compiled where expression filled in by a parameter when the plan is run
+PLACEHOLDER = "?"
+
+# number of compiled where expressions kept
+WHERECACHESIZE = 256
 
 DEFAULT_COMPARE = lambda x, y: (x > y) - (x < y)
 DEFAULT_EQUALS = lambda x, y: x == y
 
+# dict assigning value for each piece
+PIECEVALS = {
+    '': 0,
+    'T': 1,
+    'I': 2,
+    'L': 3,
+    'J': 4,
+    'S': 5,
+    'Z': 6,
+    'O': 7,
+}
+
+# longest queue that has a leftover key, the most pieces in a pc
+LEFTOVERKEYLEN = 11
+
+# value of a position past the end of the queue, after every piece so longer queues are less
+LEFTOVERKEYEND = 8
+
+@cache
+def leftoverKey(queue: str) -> int:
+    '''
+    Compute an integer key of a queue that orders queues the same as compareQueues
+
+    The key holds 4 bits for the duplicate piece followed by 4 bits for each position of the queue
+
+    Parameters:
+        queue (str): A tetris format queue of at most LEFTOVERKEYLEN pieces
+
+    Returns:
+        int: the key of the queue
+    '''
+
+    if len(queue) > LEFTOVERKEYLEN:
+        raise ValueError(f"Queue '{queue}' is longer than {LEFTOVERKEYLEN} pieces to compute its key")
+
+    # check if duplicate
+    dupPiece = ""
+    for i in range(len(queue) - 1):
+        if queue[i] == queue[i+1]:
+            dupPiece = queue[i]
+
+    key = PIECEVALS[dupPiece]
+
+    # each piece from left to right with the positions past the end last
+    for piece in queue:
+        key = (key << 4) | PIECEVALS[piece]
+    for _ in range(LEFTOVERKEYLEN - len(queue)):
+        key = (key << 4) | LEFTOVERKEYEND
+
+    return key
+
 def compareQueues(q1: str, q2: str) -> int:
     '''
     Determine if a queue is less than another queue following if duplicate follow TILJSZO, then TILJSZO, then longest
@@ -24,20 +113,12 @@ def compareQueues(q1: str, q2: str) -> int:
         1 if q1 > q2
     '''
 
-    # in the database length is lower precedence
+    # compare the precomputed keys
+    if len(q1) <= LEFTOVERKEYLEN and len(q2) <= LEFTOVERKEYLEN:
+        key1, key2 = leftoverKey(q1), leftoverKey(q2)
+        return (key1 > key2) - (key1 < key2)
 
-    # dict assigning value for each piece
-    # TODO: Remove this piece vals
-    pieceVals = {
-        '': 0,
-        'T': 1,
-        'I': 2,
-        'L': 3,
-        'J': 4,
-        'S': 5,
-        'Z': 6,
-        'O': 7,
-    }
+    # in the database length is lower precedence
 
     # check if duplicate
     dupPiece1 = ""
@@ -50,20 +131,20 @@ def compareQueues(q1: str, q2: str) -> int:
             dupPiece2 = q2[i]
 
     # compare the duplicate pieces
-    if pieceVals[dupPiece1] < pieceVals[dupPiece2]:
+    if PIECEVALS[dupPiece1] < PIECEVALS[dupPiece2]:
         return -1
-    if pieceVals[dupPiece1] > pieceVals[dupPiece2]:
+    if PIECEVALS[dupPiece1] > PIECEVALS[dupPiece2]:
         return 1
 
     # Go through each piece from left to right
     for p1, p2 in zip(q1, q2):
 
         # if piece in q1 is less than piece in q2
-        if pieceVals[p1] < pieceVals[p2]:
+        if PIECEVALS[p1] < PIECEVALS[p2]:
             return -1
 
         # if piece in q1 is greater than piece in q2
-        elif pieceVals[p1] > pieceVals[p2]:
+        elif PIECEVALS[p1] > PIECEVALS[p2]:
             return 1
 
         # otherwise same piece
@@ -84,6 +165,12 @@ COL2COMPARE = {
     "Leftover": compareQueues,
 }
 
+# dict for column to the sort key ordering the same as its comparison function, None if the value itself
+COL2KEY = {
+    "ID": None,
+    "Leftover": leftoverKey,
+}
+
 def linearSearch(text: str, 
                  db: list[dict],
                  column_name: str,
@@ -128,6 +215,7 @@ def getMatchingRange(text: str,
                      db: list[dict],
                      column_name: str,
                      op: str, compare: Callable[[Any, Any], int],
+                     key: Callable[[str], Any] | None = None,
                      ) -> list[tuple[int, int]]:
     '''
     Get the ranges where text is satisfies by the operator in the list
@@ -138,6 +226,7 @@ def getMatchingRange(text: str,
         column_name (str): name of the column to binary search
         op (str): a operator in {<>, >=, <=, <, >, =}
         compare (func): a compare functional obj that returns a boolean when comparing strings
+        key (func): a sort key ordering the same as compare, used instead of compare if given
 
     Return:
         list: a list of indices where each pair represents start and end of a range exclusive of end
@@ -148,100 +237,667 @@ def getMatchingRange(text: str,
     startIndex = 0
     endIndex = len(db)
 
-    key_func = lambda x: cmp_to_key(compare)(x[column_name])
+    if key is None:
+        key = cmp_to_key(compare)
+
+    text_key = key(text)
+    key_func = lambda x: key(x[column_name])
 
     if op == "<=":
-        endIndex = bisect_right(db, cmp_to_key(compare)(text), key=key_func)
+        endIndex = bisect_right(db, text_key, key=key_func)
 
     elif op == ">=":
-        startIndex = bisect_left(db, cmp_to_key(compare)(text), key=key_func)
+        startIndex = bisect_left(db, text_key, key=key_func)
 
     elif op == "<":
-        endIndex = bisect_left(db, cmp_to_key(compare)(text), key=key_func)
+        endIndex = bisect_left(db, text_key, key=key_func)
 
     elif op == ">":
-        startIndex = bisect_right(db, cmp_to_key(compare)(text), key=key_func)
+        startIndex = bisect_right(db, text_key, key=key_func)
 
     elif op == "=":
-        startIndex = bisect_left(db, cmp_to_key(compare)(text), key=key_func)
-        endIndex = bisect_right(db, cmp_to_key(compare)(text), key=key_func)
+        startIndex = bisect_left(db, text_key, key=key_func)
+        endIndex = bisect_right(db, text_key, key=key_func)
 
     # edge case for <> which isn't just a start and end
     elif op == "<>":
-        startIndex2 = bisect_right(db, cmp_to_key(compare)(text), key=key_func)
-        endIndex1 = bisect_left(db, cmp_to_key(compare)(text), key=key_func)
+        startIndex2 = bisect_right(db, text_key, key=key_func)
+        endIndex1 = bisect_left(db, text_key, key=key_func)
 
         return [(0, endIndex1), (startIndex2, len(db))]
 
     return [(startIndex, endIndex)]
 
-def openFile(filepath: str) -> list[dict]:
+def _snapshotPath(filepath: str) -> str:
     '''
-    Get all rows from file as a list of dictionaries representing a row
+    Get the path of the snapshot of the parsed file that sits next to the file
 
     Parameters:
         filepath (str): the filepath of a tsv database file
 
     Return:
-        list[dict]: list of rows from the file
+        str: filepath of the snapshot
+    '''
+
+    directory, filename = os.path.split(filepath)
+
+    return os.path.join(directory, f".{filename}.cache")
+
+def _hashFile(filepath: str) -> str:
+    '''
+    Compute a hash of the content of the file
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+
+    Return:
+        str: hex digest of the content
+    '''
+
+    with open(filepath, "rb") as infile:
+        return hashlib.blake2b(infile.read(), digest_size=16).hexdigest()
+
+def readTsv(filepath: str) -> tuple[list[str], list[list[str]]]:
+    '''
+    Read the column names and the values of each row of the tsv file
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+
+    Return:
+        tuple[list[str], list[list[str]]]: names of the columns and values of each row
     '''
 
     # get data from the file
     with open(filepath, "r") as infile:
-        db = list(DictReader(infile, delimiter="\t"))
+        tsv_reader = reader(infile, delimiter="\t")
 
-    return db
+        columns = next(tsv_reader, [])
 
-def queryWhere(db: list[dict], 
-               where: str = "", 
-               compare: Callable[[str, str], bool] = DEFAULT_COMPARE,
-               equals: Callable[[str, str], bool] = DEFAULT_EQUALS,
-               ) -> list[dict]:
+        # skip empty lines
+        rows = [values for values in tsv_reader if values]
+
+    return columns, rows
+
+def _parseFile(filepath: str) -> ColumnStore:
     '''
-    Get all rows with the specific column filtering with where
+    Parse the tsv file into a store of the values of each column
 
     Parameters:
-        db (list): a list of rows in the format of a dictionary
-        where (str): expression of in format column operator value
-        compare (func): function to compare for binary search
-        equals (func): function to compare for linear search
+        filepath (str): the filepath of a tsv database file
 
     Return:
-        list[dict]: list of filtered rows from where
+        ColumnStore: values of the rows from the file
+    '''
+
+    return ColumnStore.fromValues(*readTsv(filepath))
+
+def _loadSnapshot(filepath: str, stamp: tuple[int, int]) -> ColumnStore | None:
+    '''
+    Load the parsed values from the snapshot if it's still valid for the file
+
+    The snapshot is valid if the modification time and size of the file match.
+    Otherwise the content hash is compared, so a touched but unchanged file
+    keeps its snapshot.
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+        stamp (tuple): modification time in ns and size of the file
+
+    Return:
+        ColumnStore | None: values from the snapshot or None if there's no valid snapshot
+    '''
+
+    try:
+        with open(_snapshotPath(filepath), "rb") as infile:
+            snapshot = pickle.load(infile)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != CACHEVERSION:
+        return None
+
+    if snapshot["stamp"] == stamp:
+        return snapshot["store"]
+
+    # modified time changed but the content may be the same
+    if snapshot["stamp"][1] == stamp[1] and snapshot["hash"] == _hashFile(filepath):
+        _writeSnapshot(filepath, stamp, snapshot["hash"], snapshot["store"])
+        return snapshot["store"]
+
+    return None
+
+def _writeSnapshot(filepath: str, stamp: tuple[int, int], digest: str, store: ColumnStore) -> None:
+    '''
+    Write the parsed values into the snapshot next to the file
+
+    Failing to write the snapshot is not an error as it's only a cache
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+        stamp (tuple): modification time in ns and size of the file
+        digest (str): hash of the content of the file
+        store (ColumnStore): the parsed values of the file
+    '''
+
+    snapshot = {
+        "version": CACHEVERSION,
+        "stamp": stamp,
+        "hash": digest,
+        "store": store,
+    }
+
+    snapshot_path = _snapshotPath(filepath)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+
+    try:
+        # write to temporary file first so readers never see a partial snapshot
+        with open(tmp_path, "wb") as outfile:
+            pickle.dump(snapshot, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def indexSearch(text: str,
+                db: Table,
+                column_name: str,
+                op: str,
+                ) -> list[int]:
+    '''
+    Get the positions in the table where text is satisfied by the operator using the indexes of the table
+
+    Parameters:
+        text (str): a string to be found in the table
+        db (Table): a table of rows
+        column_name (str): name of the column to search
+        op (str): a operator in {<>, >=, <=, <, >, =}, only = and <> if the column has no ordering
+
+    Returns:
+        list[int]: positions in the table in table order
+    '''
+
+    # equality through the hash index
+    if op == "=":
+        return db.hashIndex(column_name).get(text, [])
+
+    if op == "<>":
+        excluded = set(db.hashIndex(column_name).get(text, ()))
+        return [i for i in range(len(db)) if i not in excluded]
+
+    # ranges need an ordering on the column
+    if column_name not in COL2KEY:
+        raise ValueError(f"Got an invalid operator for column without ordering '{op}'")
+
+    return db.sortedIndex(column_name, COL2KEY[column_name]).select(text, op)
+
+def openFile(filepath: str, use_cache: bool = True, backend: str = "tsv") -> Table | SqlTable:
+    '''
+    Get all rows from file as a list of dictionaries representing a row
+
+    The parsed values are kept in memory and in a snapshot next to the file,
+    both invalidated when the file changes
+
+    With the sqlite backend the file is imported into the database when it changed
+    and queries on the returned table run in the database
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+        use_cache (bool): whether to use the parsed values from previous opens
+        backend (str): where the rows are read from, either tsv or sqlite
+
+    Return:
+        Table | SqlTable: list of rows from the file
+    '''
+
+    if backend == "sqlite":
+        return openSqlTable(filepath)
+    if backend != "tsv":
+        raise ValueError(f"Got an invalid backend '{backend}'")
+
+    if not use_cache:
+        return Table.fromStore(_parseFile(filepath))
+
+    # copy the values as the callers are free to modify the rows
+    return Table.fromStore(openStore(filepath).copy())
+
+def openStore(filepath: str) -> ColumnStore:
+    '''
+    Get the parsed values of the file shared by every open of the file in this process
+
+    The values are kept in memory and in a snapshot next to the file,
+    both invalidated when the file changes
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+
+    Return:
+        ColumnStore: read only values of the rows from the file
+    '''
+
+    stat = os.stat(filepath)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.realpath(filepath)
+
+    # already parsed in this process
+    opened = _OPENEDFILES.get(key)
+    if opened is not None and opened[0] == stamp:
+        return opened[1]
+
+    store = _loadSnapshot(filepath, stamp)
+
+    if store is None:
+        # hash before parsing so a change during the parse invalidates the snapshot
+        digest = _hashFile(filepath)
+        store = _parseFile(filepath)
+        _writeSnapshot(filepath, stamp, digest, store)
+
+    store.readonly = True
+    _OPENEDFILES[key] = (stamp, store)
+
+    return store
+
+def parseWhere(where: str) -> list[list[tuple[str, str, str]]]:
+    '''
+    Parse a where expression into the conditions it is made of
+
+    The expression is conditions in format column operator value joined by AND and OR,
+    where AND binds tighter than OR
+
+    Parameters:
+        where (str): a where expression
+
+    Return:
+        list[list[tuple]]: conditions of column, operator and value joined by AND in the inner lists and OR in the outer list
+    '''
+
+    clauses = []
+    for clause in where.split(ORKEYWORD):
+        conditions = []
+
+        for condition in clause.split(ANDKEYWORD):
+            parts = OPERATORREGEX.split(condition, maxsplit=1)
+
+            if len(parts) != 3:
+                raise ValueError(f"Condition '{condition}' in '{where}' is not in format column operator value")
+
+            conditions.append(tuple(parts))
+
+        clauses.append(conditions)
+
+    return clauses
+
+def _conditionTest(condition: tuple[str, str, str],
+                   compare: Callable[[str, str], int],
+                   equals: Callable[[str, str], bool],
+                   ) -> Callable[[dict], bool]:
+    '''
+    Make a function testing if a row satisfies the condition
+
+    Parameters:
+        condition (tuple): column, operator and value of the condition
+        compare (func): function to compare for every operator if not the default
+        equals (func): function to compare for = and <> otherwise
+
+    Return:
+        func: function taking a row and returning whether the condition is satisfied
+    '''
+
+    column, op, value = condition
+
+    # a passed in compare is used for every operator
+    if compare is not DEFAULT_COMPARE:
+        op_func = OP2FUNC[op]
+        return lambda row: op_func(compare(row[column], value), 0)
+
+    if op == "=":
+        return lambda row: equals(value, row[column])
+    if op == "<>":
+        return lambda row: not equals(value, row[column])
+
+    # ranges need an ordering on the column
+    if column not in COL2KEY:
+        raise ValueError(f"Got an invalid operator for column without ordering '{op}'")
+
+    op_func = OP2FUNC[op]
+
+    # compare by the sort key of the column
+    key = COL2KEY[column]
+    if key is None:
+        return lambda row: op_func(row[column], value)
+
+    value_key = key(value)
+    return lambda row: op_func(key(row[column]), value_key)
+
+def _estimateCount(db: Table, condition: tuple[str, str, str]) -> int:
     '''
-    
-    if len(db) == 0:
-        return db
+    Number of rows in the table the condition selects based on the indexes
+
+    Parameters:
+        db (Table): a table of rows
+        condition (tuple): column, operator and value of the condition
+
+    Return:
+        int: number of rows selected by the condition
+    '''
+
+    column, op, value = condition
+
+    if op == "=":
+        return len(db.hashIndex(column).get(value, ()))
+    if op == "<>":
+        return len(db) - len(db.hashIndex(column).get(value, ()))
+
+    return db.sortedIndex(column, COL2KEY[column]).count(value, op)
+
+def planWhere(db: Table, conditions: list[tuple[str, str, str]]) -> list[int]:
+    '''
+    Get the positions in the table satisfying all the conditions
+
+    The condition selecting the fewest rows by the indexes gives the candidates,
+    the rest of the conditions are checked on the candidates in a single pass
+
+    Parameters:
+        db (Table): a table of rows
+        conditions (list): column, operator and value of each condition
+
+    Return:
+        list[int]: positions in the table in table order
+    '''
+
+    # only conditions on ordered columns can use the sorted index
+    indexable = [c for c in conditions if c[1] in ("=", "<>") or c[0] in COL2KEY]
+
+    if indexable:
+        best = min(indexable, key=lambda c: _estimateCount(db, c))
+        positions = indexSearch(best[2], db, best[0], best[1])
+    else:
+        best = None
+        positions = range(len(db))
+
+    tests = [_conditionTest(c, DEFAULT_COMPARE, DEFAULT_EQUALS) for c in conditions if c is not best]
+
+    if not tests:
+        return list(positions)
+
+    return [i for i in positions if all(test(db[i]) for test in tests)]
+
+class WherePlan:
+    '''
+    Parsed where expression that can be run on many tables
+
+    Values equal to the placeholder are parameters given when the plan is run,
+    so one plan serves every where expression differing only in those values
+
+    Attributes:
+        where (str): the where expression
+        clauses (tuple): conditions of column, operator and value joined by AND in the inner tuples and OR in the outer tuple
+        param_count (int): number of parameters the plan is run with
+    '''
+
+    def __init__(self, where: str, placeholder: str | None = PLACEHOLDER):
+        self.where = where
+        self.clauses = tuple(map(tuple, parseWhere(where))) if where else ()
+
+        # clause and condition positions of the parameters in order
+        self._param_positions = [
+            (i, j)
+            for i, conditions in enumerate(self.clauses)
+            for j, condition in enumerate(conditions)
+            if placeholder is not None and condition[2] == placeholder
+        ]
+        self.param_count = len(self._param_positions)
+
+        # tests of the conditions with the default comparisons, built on first use
+        self._default_tests = None
+
+    def __repr__(self) -> str:
+        return f"WherePlan({self.where!r})"
+
+    def bind(self, params: tuple[str, ...]) -> tuple[tuple[tuple[str, str, str], ...], ...]:
+        '''
+        Get the conditions with the parameters filled in
+
+        Parameters:
+            params (tuple): values of the parameters in order
+
+        Return:
+            tuple: conditions of column, operator and value joined by AND in the inner tuples and OR in the outer tuple
+        '''
+
+        if len(params) != self.param_count:
+            raise ValueError(f"Where '{self.where}' takes {self.param_count} parameters but got {len(params)}")
+
+        if not params:
+            return self.clauses
+
+        clauses = [list(conditions) for conditions in self.clauses]
+        for (i, j), value in zip(self._param_positions, params):
+            column, op, _ = clauses[i][j]
+            clauses[i][j] = (column, op, value)
+
+        return tuple(map(tuple, clauses))
+
+    def predicate(self,
+                  *params: str,
+                  compare: Callable[[str, str], int] = DEFAULT_COMPARE,
+                  equals: Callable[[str, str], bool] = DEFAULT_EQUALS,
+                  ) -> Callable[[dict], bool]:
+        '''
+        Make a function testing if a row satisfies the where expression
+
+        Parameters:
+            params (str): values of the parameters in order
+            compare (func): function to compare for every operator if not the default
+            equals (func): function to compare for = and <> otherwise
+
+        Return:
+            func: function taking a row and returning whether the where expression is satisfied
+        '''
+
+        is_default = not params and compare is DEFAULT_COMPARE and equals is DEFAULT_EQUALS
+
+        if is_default and self._default_tests is not None:
+            tests = self._default_tests
+        else:
+            tests = [[_conditionTest(c, compare, equals) for c in conditions] for conditions in self.bind(params)]
+            if is_default:
+                self._default_tests = tests
 
-    # parse the where
-    if where:
-        operators = ["<>", ">=", "<=", "<", ">", "="]
-        where_col, op, val = re.split(f"({'|'.join(operators)})", where)    
+        if not tests:
+            return lambda row: True
+
+        return lambda row: any(all(test(row) for test in clause_tests) for clause_tests in tests)
+
+    def matches(self, row: dict, *params: str) -> bool:
+        '''Whether the row satisfies the where expression with the parameters'''
+
+        return self.predicate(*params)(row)
+
+    def query(self,
+              db: list[dict],
+              *params: str,
+              compare: Callable[[str, str], bool] = DEFAULT_COMPARE,
+              equals: Callable[[str, str], bool] = DEFAULT_EQUALS,
+              ) -> list[dict]:
+        '''
+        Get all rows satisfying the where expression with the parameters
+
+        If db is a Table and no compare or equals is passed, the indexes of the table are used,
+        a SqlTable runs the query in the database
+
+        Parameters:
+            db (list): a list of rows in the format of a dictionary
+            params (str): values of the parameters in order
+            compare (func): function to compare for binary search
+            equals (func): function to compare for linear search
+
+        Return:
+            list[dict]: list of filtered rows
+        '''
+
+        clauses = self.bind(params)
+
+        # run the query in the database unless the comparisons are custom
+        if isinstance(db, SqlTable):
+            if compare is DEFAULT_COMPARE and equals is DEFAULT_EQUALS:
+                return db.query(ORKEYWORD.join(ANDKEYWORD.join(map("".join, conditions)) for conditions in clauses))
+
+            db = db.rows()
+
+        if len(db) == 0 or not clauses:
+            return db
+
+        # use the indexes of the table
+        if isinstance(db, Table) and compare is DEFAULT_COMPARE and equals is DEFAULT_EQUALS:
+            if len(clauses) == 1:
+                return db.take(planWhere(db, clauses[0]))
+
+            positions = set()
+            for conditions in clauses:
+                positions.update(planWhere(db, conditions))
+
+            return db.take(sorted(positions))
+
+        # several conditions are all checked in one pass over the rows
+        if len(clauses) > 1 or len(clauses[0]) > 1:
+            row_test = self.predicate(*params, compare=compare, equals=equals)
+
+            return [row for row in db if row_test(row)]
+
+        where_col, op, val = clauses[0][0]
 
         # set compare to default compare function if the column has one
         is_default_compare = True
+        key = None
         if where_col in COL2COMPARE and compare is DEFAULT_COMPARE:
             compare = COL2COMPARE[where_col]
+            key = COL2KEY[where_col]
             is_default_compare = False
 
         # if compare has been changed or a compare was passed in
         if not is_default_compare or compare is not DEFAULT_COMPARE:
-            indices = getMatchingRange(val, db, where_col, op, compare=compare)
+            indices = getMatchingRange(val, db, where_col, op, compare=compare, key=key)
 
             # filtered out the rows
             rows = []
             for start, end in indices:
                 rows += db[start: end]
 
-            db = rows
+            return rows
 
-        else:
-            indices = linearSearch(val, db, where_col, op, equals=equals)
+        indices = linearSearch(val, db, where_col, op, equals=equals)
 
-            # filtered out the rows
-            db = [db[i] for i in indices]
+        # filtered out the rows
+        return [db[i] for i in indices]
+
+@lru_cache(maxsize=WHERECACHESIZE)
+def compileWhere(where: str, placeholder: str | None = PLACEHOLDER) -> WherePlan:
+    '''
+    Get the plan of the where expression, reusing the plan of a where expression seen before
+
+    Parameters:
+        where (str): expression of conditions in format column operator value joined by AND and OR
+        placeholder (str | None): value marking a parameter, None for no parameters
+
+    Return:
+        WherePlan: the plan of the where expression
+    '''
+
+    return WherePlan(where, placeholder)
+
+def queryWhere(db: list[dict], 
+               where: str = "", 
+               compare: Callable[[str, str], bool] = DEFAULT_COMPARE,
+               equals: Callable[[str, str], bool] = DEFAULT_EQUALS,
+               ) -> list[dict]:
+    '''
+    Get all rows with the specific column filtering with where
+
+    If db is a Table and no compare or equals is passed, the indexes of the table are used,
+    a SqlTable runs the query in the database
+
+    Parameters:
+        db (list): a list of rows in the format of a dictionary
+        where (str): expression of conditions in format column operator value joined by AND and OR
+        compare (func): function to compare for binary search
+        equals (func): function to compare for linear search
+
+    Return:
+        list[dict]: list of filtered rows from where
+    '''
+
+    return compileWhere(where, placeholder=None).query(db, compare=compare, equals=equals)
+
+def iterRows(filepath: str,
+             where: str = "",
+             compare: Callable[[str, str], bool] = DEFAULT_COMPARE,
+             equals: Callable[[str, str], bool] = DEFAULT_EQUALS,
+             ) -> Iterator[dict]:
+    '''
+    Yield the rows of the file satisfying where while reading the file line by line
+
+    Only the columns up to the last one in where are split to test a line,
+    the rest of the line is only split for the lines satisfying where
+
+    Parameters:
+        filepath (str): the filepath of a tsv database file
+        where (str): expression of conditions in format column operator value joined by AND and OR
+        compare (func): function to compare for every operator
+        equals (func): function to compare for = and <>
+
+    Yield:
+        dict: a row from the file satisfying where
+    '''
+
+    with open(filepath, "r") as infile:
+        columns = next(reader(infile, delimiter="\t"), [])
+
+        row_test = None
+        if where:
+            plan = compileWhere(where, placeholder=None)
+            clauses = plan.clauses
+            row_test = plan.predicate(compare=compare, equals=equals)
+
+            # columns the conditions are on with their position
+            where_columns = {column for conditions in clauses for column, _, _ in conditions}
+            missing_columns = where_columns - set(columns)
+            if missing_columns:
+                raise KeyError(min(missing_columns))
+
+            where_positions = [(column, columns.index(column)) for column in where_columns]
+            split_count = max(position for _, position in where_positions) + 1
+
+        for line in infile:
+            line = line.rstrip("\r\n")
+
+            # skip empty lines
+            if not line:
+                continue
+
+            # lines with quoted values need the csv parsing
+            if '"' in line:
+                values = next(reader([line], delimiter="\t"))
+
+                if row_test is not None and not row_test(dict(zip(columns, values))):
+                    continue
+
+            else:
+                if row_test is not None:
+                    parts = line.split("\t", split_count)
+                    parts += [None] * (split_count - len(parts))
+
+                    if not row_test({column: parts[position] for column, position in where_positions}):
+                        continue
+
+                values = line.split("\t")
+
+            # missing values are None
+            values += [None] * (len(columns) - len(values))
 
-    return db
+            yield dict(zip(columns, values))
 
 if __name__ == "__main__":
     print(queryWhere(openFile("../../tsv/2ndPC.tsv"), "Leftover=SSZO"))
@@ -1,15 +1,18 @@
 # Script that is inverse function of extendPieces
 
-from .pieces import extendPieces
+from .pattern import compilePattern
+from .packed import pack_queue, packed_prefix
 from typing import Callable
 
-def matching_queue(queue: str, pattern: str, equality: Callable[[str, str], bool] = lambda x, y: x == y) -> int:
+def matching_queue(queue: str, pattern: str, equality: Callable[[str, str], bool] | None = None, prefix: bool = False) -> int:
     '''
     Find where a queue is within the extended pieces
     
     Parameters:
         queue (str): A tetris format queue
         pattern (str): A pattern for extended pieces
+        equality (func): a equality functional obj that returns boolean when two queues are equal, searches the extended pieces if given
+        prefix (bool): whether to find the queue of the extended pieces the queue starts with
 
     Returns:
         int: index where the queue was found in the extended pieces
@@ -22,8 +25,22 @@ def matching_queue(queue: str, pattern: str, equality: Callable[[str, str], bool
         if piece not in validPieces:
             raise ValueError(f"The piece '{piece}' is not a valid piece")
 
-    # get a generator obj of the output queues
-    outQueues = list(extendPieces(pattern))
+    compiled = compilePattern(pattern)
+
+    # compute the index from the pattern
+    if equality is None:
+        if not prefix:
+            return compiled.rank(queue)
+
+        # the queues of the pattern have one length so the queue can only start with one of them
+        lengths = compiled.root.lengths()
+        if len(lengths) == 1:
+            return compiled.rank(queue[:next(iter(lengths))])
+
+        equality = lambda x, y: y.startswith(x)
+
+    # get the output queues
+    outQueues = compiled.queues()
 
     return binary_search(queue, outQueues, equality=equality)
 
@@ -40,32 +57,13 @@ def compare_queues(q1: str, q2: str) -> bool:
 
     '''
 
-    # dict assigning value for each piece
-    pieceVals = {
-        'T': 1,
-        'I': 2,
-        'L': 3,
-        'J': 4,
-        'S': 5,
-        'Z': 6,
-        'O': 7,
-    }
-
-    # Go through each piece from left to right
-    for p1, p2 in zip(q1, q2):
-
-        # if piece in q1 is less than piece in q2
-        if pieceVals[p1] < pieceVals[p2]:
-            return True
-
-        # if piece in q1 is greater than piece in q2
-        elif pieceVals[p1] > pieceVals[p2]:
-            return False
-
-        # otherwise same piece
+    # only the pieces both queues have are compared
+    length = min(len(q1), len(q2))
+    if length == 0:
+        return False
 
-    # exactly the same queues
-    return False
+    # packed queues of the same length compare in TILJSZO order
+    return packed_prefix(pack_queue(q1), length) < packed_prefix(pack_queue(q2), length)
 
 def binary_search(queue: str, 
                  queue_lst: list[str], 
@@ -0,0 +1,193 @@
+# Queues packed into integers with 3 bits for each piece
+
+from typing import Iterable
+
+# numpy is optional, queues are sorted by their packed queue without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# bag constant
+BAG = "TILJSZO"
+
+# pieces to their octal digit, T is 1 so no piece is 0 and the length is kept
+PIECECODES = {piece: code for code, piece in enumerate(BAG, 1)}
+PACKTABLE = str.maketrans(BAG, "1234567")
+UNPACKTABLE = str.maketrans("1234567", BAG)
+
+# octal digits of the pieces to the digits of the mirrored pieces
+MIRRORTABLE = str.maketrans("3456", "4365")
+
+# the packed queue of no pieces, the root of any packed prefixes
+EMPTY = 0
+
+# fewest queues of a length before they're radix sorted if numpy is installed
+RADIXSORTMINQUEUES = 2048
+
+# pieces in each digit of the radix sort, 3 bits each in 16 bit digits
+RADIXDIGITPIECES = 5
+
+# bytes of the pieces to their code and any other byte to 0
+RADIXTABLE = bytes(PIECECODES.get(chr(byte), 0) for byte in range(256))
+
+def pack_queue(queue: str) -> int:
+    '''
+    Pack a queue into an integer
+
+    Packed queues compare in the same order as sort_queues, by length then TILJSZO order
+
+    Parameter:
+        queue (str): A queue with pieces in {T,I,L,J,S,Z,O} and at least one piece
+
+    Return:
+        int: the pieces as the octal digits of the integer
+    '''
+
+    # anything left after stripping the pieces isn't a piece, raised the same as a lookup of the piece
+    if queue.strip(BAG):
+        raise KeyError(next(char for char in queue if char not in PIECECODES))
+
+    return int(queue.translate(PACKTABLE), 8)
+
+def unpack_queue(packed: int) -> str:
+    '''
+    Unpack a packed queue
+
+    Parameter:
+        packed (int): a packed queue
+
+    Return:
+        str: the queue
+    '''
+
+    if packed == EMPTY:
+        return ""
+
+    return oct(packed)[2:].translate(UNPACKTABLE)
+
+def packed_length(packed: int) -> int:
+    '''
+    Number of pieces of a packed queue
+
+    Parameter:
+        packed (int): a packed queue
+
+    Return:
+        int: length of the queue
+    '''
+
+    return (packed.bit_length() + 2) // 3
+
+def packed_push(packed: int, piece: str) -> int:
+    '''
+    Add a piece to the end of a packed queue
+
+    Parameter:
+        packed (int): a packed queue
+        piece (str): A piece in {T,I,L,J,S,Z,O}
+
+    Return:
+        int: the packed queue with the piece at the end
+    '''
+
+    return (packed << 3) | PIECECODES[piece]
+
+def packed_prefix(packed: int, length: int) -> int:
+    '''
+    The first pieces of a packed queue
+
+    Parameter:
+        packed (int): a packed queue
+        length (int): number of pieces to keep, at most the length of the queue
+
+    Return:
+        int: the packed queue of the first length pieces
+    '''
+
+    return packed >> (3 * (packed_length(packed) - length))
+
+def packed_startswith(packed: int, prefix: int) -> bool:
+    '''
+    Check if a packed queue starts with another
+
+    Parameter:
+        packed (int): a packed queue
+        prefix (int): a packed queue
+
+    Return:
+        bool: whether the queue starts with the prefix
+    '''
+
+    shift = packed_length(packed) - packed_length(prefix)
+
+    return shift >= 0 and packed >> (3 * shift) == prefix
+
+def radix_sort_queues(queues: Iterable[str]) -> list[str]:
+    '''
+    Sort queues by length then TILJSZO order, the same as sorting by pack_queue
+
+    Queues are bucketed by length and large buckets are sorted with a least significant
+    digit radix sort on the codes of the pieces, one stable pass for every few positions
+
+    Parameter:
+        queues (Iterable[str]): queues with pieces in {T,I,L,J,S,Z,O} and at least one piece
+
+    Return:
+        list[str]: the sorted queues
+    '''
+
+    if np is None:
+        return sorted(queues, key=pack_queue)
+
+    buckets: dict[int, list[str]] = {}
+    for queue in queues:
+        buckets.setdefault(len(queue), []).append(queue)
+
+    sorted_queues = []
+    for length in sorted(buckets):
+        bucket = buckets[length]
+
+        if len(bucket) < RADIXSORTMINQUEUES or length == 0:
+            sorted_queues += sorted(bucket, key=pack_queue)
+            continue
+
+        # not ascii means not pieces, left to raise in pack_queue
+        data = "".join(bucket).encode().translate(RADIXTABLE)
+        if len(data) != len(bucket) * length:
+            sorted_queues += sorted(bucket, key=pack_queue)
+            continue
+
+        codes = np.frombuffer(data, dtype=np.uint8).reshape(-1, length)
+        if not codes.all():
+            sorted_queues += sorted(bucket, key=pack_queue)
+            continue
+
+        # stable sorts of 16 bit ints in numpy are radix sorts
+        order = np.arange(len(bucket))
+        for end in range(length, 0, -RADIXDIGITPIECES):
+            digits = np.zeros(len(bucket), dtype=np.uint16)
+            for column in range(max(end - RADIXDIGITPIECES, 0), end):
+                digits = (digits << np.uint16(3)) | codes[order, column]
+
+            order = order[np.argsort(digits, kind="stable")]
+
+        sorted_queues += map(bucket.__getitem__, order.tolist())
+
+    return sorted_queues
+
+def mirror_packed(packed: int) -> int:
+    '''
+    Mirror the pieces of a packed queue in place
+
+    Parameter:
+        packed (int): a packed queue
+
+    Return:
+        int: the packed queue with L and J and S and Z swapped
+    '''
+
+    if packed == EMPTY:
+        return EMPTY
+
+    return int(oct(packed)[2:].translate(MIRRORTABLE), 8)
@@ -0,0 +1,1777 @@
+# Compiled extended pieces patterns that are parsed once and reused
+
+import os
+import re
+import heapq
+import bisect
+import hashlib
+import threading
+from collections import Counter, OrderedDict, deque, namedtuple
+from functools import lru_cache
+from math import comb, prod
+from itertools import islice, permutations, product
+from concurrent.futures import ProcessPoolExecutor
+from string import whitespace
+from typing import Any, Callable, Hashable, Iterator, TextIO
+from .pieces import (
+    BAG, COUNTMODIFIERREGEX, BEFOREMODIFIERREGEX, COUNTOPERATORS,
+    sort_queues, make_modifier_tree, compileModifier, parsePrefixesInModifier, splitSetNotation,
+)
+from .automaton import Automaton
+from .packed import pack_queue, EMPTY
+from . import vectorize
+
+# number of compiled patterns kept
+PATTERNCACHESIZE = 1024
+
+# total number of queues kept by the cache of the queues of patterns
+QUEUECACHESIZE = 500_000
+
+# parts of a normal sfinder pieces with the prefix of pieces and suffix of permutate
+PIECESPARTREGEX = re.compile(r"([*TILJSZO]|\[\^?[TILJSZO]+\]|<.*>)(p[1-7]|!)?")
+PIECESSETREGEX = re.compile(r"\[\^?([TILJSZO]+)\]")
+
+# splits the patterns of an extended pieces
+PATTERNSPLITREGEX = re.compile("\n|;")
+
+# most queues of the later parts of a product kept while streaming instead of generating them again
+STREAMBUFFERSIZE = 4096
+
+# fewest queues before a pattern until its queues are generated as numpy matrices if numpy is installed
+VECTORIZEMINQUEUES = 2048
+
+# fewest queues before a pattern is split into shards generated in worker processes
+SHARDMINQUEUES = 1 << 16
+
+# most fingerprints of patterns kept, each only a count and digest
+FINGERPRINTCACHESIZE = 1 << 16
+
+# shards being generated or waiting to be read for each worker
+SHARDSPERWORKER = 2
+
+# most workers before shards are split by the first piece instead of the first two pieces
+SHARDDEPTHWORKERS = 2
+
+def queueKey(queue: str) -> int:
+    '''
+    Key ordering queues the same as sort_queues, by length then TILJSZO order
+
+    Parameters:
+        queue (str): a tetris format queue
+
+    Return:
+        int: the packed queue
+    '''
+
+    return pack_queue(queue) if queue else EMPTY
+
+@lru_cache(maxsize=None)
+def _orderings(piece_counts: tuple[int, ...], length: int) -> int:
+    '''
+    Number of distinct orderings of length pieces taken from pieces with the counts
+
+    Parameters:
+        piece_counts (tuple[int]): sorted number of times each piece can be taken
+        length (int): number of pieces taken
+
+    Return:
+        int: number of distinct queues
+    '''
+
+    # distinct orderings of each length using the pieces so far
+    orderings = [1] + [0] * length
+    for piece_count in piece_counts:
+        new_orderings = [0] * (length + 1)
+
+        for sub_length, number in enumerate(orderings):
+            if not number:
+                continue
+
+            # place this piece j times among the sub_length + j positions
+            for j in range(min(piece_count, length - sub_length) + 1):
+                new_orderings[sub_length + j] += number * comb(sub_length + j, j)
+
+        orderings = new_orderings
+
+    return orderings[length]
+
+def _dedupe(queues: Iterator[str]) -> Iterator[str]:
+    '''Drop the repeats of sorted queues'''
+
+    previous = None
+    for queue in queues:
+        if queue != previous:
+            yield queue
+            previous = queue
+
+class Node:
+    '''
+    Part of a compiled pattern giving a set of queues
+
+    Queues are generated in no particular order and may repeat
+    '''
+
+    def generate(self) -> Iterator[str]:
+        '''Generate the queues of the node'''
+
+        raise NotImplementedError
+
+    def lengths(self) -> frozenset[int]:
+        '''Lengths of the queues of the node'''
+
+        raise NotImplementedError
+
+    def count(self) -> int:
+        '''Number of distinct queues of the node, enumerating them if it can't be computed'''
+
+        return len(set(self.generate()))
+
+    def maxCount(self) -> int:
+        '''Upper bound of the number of distinct queues of the node without enumerating any'''
+
+        raise NotImplementedError
+
+    def filtered(self) -> bool:
+        '''Whether generating the queues of the node checks them against a modifier or another node'''
+
+        return False
+
+    def iterSorted(self) -> Iterator[str]:
+        '''Generate the distinct queues of the node sorted the same as sort_queues'''
+
+        return iter(sorted(set(self.generate()), key=queueKey))
+
+    def matrices(self) -> dict[int, "vectorize.np.ndarray"]:
+        '''
+        Generate the queues of the node as numpy matrices of piece codes
+
+        Return:
+            dict: length of the queues to the matrix with a row for each queue, rows may repeat
+        '''
+
+        queues_by_length = {}
+        for queue in set(self.generate()):
+            queues_by_length.setdefault(len(queue), []).append(queue)
+
+        return {length: vectorize.queuesToMatrix(queues, length) for length, queues in queues_by_length.items()}
+
+    def restrict(self, prefix: str) -> "Node | None":
+        '''
+        Node of the queues of the node starting with the prefix
+
+        Parameters:
+            prefix (str): pieces the queues start with
+
+        Return:
+            Node | None: node of the queues with the prefix or None if the node can't be restricted
+        '''
+
+        return None
+
+    def rankable(self) -> bool:
+        '''Whether rank and unrank can be computed from the structure of the node'''
+
+        return False
+
+    def rank(self, queue: str) -> int:
+        '''
+        Index of the queue in the sorted distinct queues of the node
+
+        Parameters:
+            queue (str): a tetris format queue
+
+        Return:
+            int: index of the queue or -1 if it isn't a queue of the node
+        '''
+
+        raise NotImplementedError
+
+    def unrank(self, index: int) -> str:
+        '''
+        Queue at the index in the sorted distinct queues of the node
+
+        Parameters:
+            index (int): index from 0 to less than count()
+
+        Return:
+            str: the queue at the index
+        '''
+
+        raise NotImplementedError
+
+    def startStates(self) -> Iterator[Hashable]:
+        '''States of the node as an automaton before reading any piece'''
+
+        raise NotImplementedError
+
+    def step(self, state: Hashable, piece: str) -> Iterator[Hashable]:
+        '''
+        States of the node as an automaton after reading a piece
+
+        Parameters:
+            state (Hashable): a state of the node
+            piece (str): the piece read
+
+        Return:
+            Iterator[Hashable]: the states reached
+        '''
+
+        raise NotImplementedError
+
+    def accepts(self, state: Hashable) -> bool:
+        '''Whether the pieces read to reach the state make a queue of the node'''
+
+        raise NotImplementedError
+
+class Choose(Node):
+    '''
+    Every ordering of length pieces taken from the pieces
+
+    Attributes:
+        pieces (str): the pieces to take from, repeated if a piece can be taken several times
+        length (int): number of pieces taken
+    '''
+
+    def __init__(self, pieces: str, length: int):
+        self.pieces = pieces
+        self.length = length
+        self._piece_counts = Counter(pieces)
+
+    def __repr__(self) -> str:
+        return f"Choose({self.pieces!r}, {self.length})"
+
+    def generate(self) -> Iterator[str]:
+        return iter(set(map("".join, permutations(self.pieces, self.length))))
+
+    def lengths(self) -> frozenset[int]:
+        return frozenset((self.length,))
+
+    def count(self) -> int:
+        return _orderings(tuple(sorted(self._piece_counts.values())), self.length)
+
+    maxCount = count
+
+    def iterSorted(self) -> Iterator[str]:
+        # take the pieces in TILJSZO order at each position
+        pieces = [piece for piece in BAG if piece in self._piece_counts]
+        remaining = {piece: self._piece_counts[piece] for piece in pieces}
+        queue = []
+
+        def take(length: int) -> Iterator[str]:
+            if length == 0:
+                yield "".join(queue)
+                return
+
+            for piece in pieces:
+                if remaining[piece]:
+                    remaining[piece] -= 1
+                    queue.append(piece)
+
+                    yield from take(length - 1)
+
+                    queue.pop()
+                    remaining[piece] += 1
+
+        return take(self.length)
+
+    def matrices(self) -> dict[int, "vectorize.np.ndarray"]:
+        return {self.length: vectorize.queuesToMatrix(list(self.iterSorted()), self.length)}
+
+    def restrict(self, prefix: str) -> Node:
+        prefix_counts = Counter(prefix)
+        if len(prefix) > self.length or any(self._piece_counts[piece] < count for piece, count in prefix_counts.items()):
+            return Union([])
+
+        # the pieces of the prefix then any ordering of the pieces left
+        remaining = "".join(piece * (count - prefix_counts[piece]) for piece, count in self._piece_counts.items())
+
+        return Product([*(Choose(piece, 1) for piece in prefix), Choose(remaining, self.length - len(prefix))])
+
+    def _remainingOrderings(self, remaining: Counter, length: int) -> int:
+        return _orderings(tuple(sorted(remaining.values())), length)
+
+    def rankable(self) -> bool:
+        return True
+
+    def rank(self, queue: str) -> int:
+        if len(queue) != self.length:
+            return -1
+
+        remaining = self._piece_counts.copy()
+        index = 0
+        for position, piece in enumerate(queue):
+            if remaining[piece] <= 0:
+                return -1
+
+            # skip the queues with an earlier piece at this position
+            for earlier_piece in BAG[:BAG.index(piece)]:
+                if remaining[earlier_piece] > 0:
+                    remaining[earlier_piece] -= 1
+                    index += self._remainingOrderings(remaining, self.length - position - 1)
+                    remaining[earlier_piece] += 1
+
+            remaining[piece] -= 1
+
+        return index
+
+    def unrank(self, index: int) -> str:
+        if not 0 <= index < self.count():
+            raise IndexError(f"Index {index} out of range of {self!r}")
+
+        remaining = self._piece_counts.copy()
+        queue = ""
+        for position in range(self.length):
+            for piece in BAG:
+                if remaining[piece] <= 0:
+                    continue
+
+                # number of queues with this piece at this position
+                remaining[piece] -= 1
+                number = self._remainingOrderings(remaining, self.length - position - 1)
+
+                if index < number:
+                    queue += piece
+                    break
+
+                index -= number
+                remaining[piece] += 1
+
+        return queue
+
+    def startStates(self) -> Iterator[Hashable]:
+        # pieces left to take in TILJSZO order and number of pieces taken
+        yield tuple(self._piece_counts[piece] for piece in BAG), 0
+
+    def step(self, state: Hashable, piece: str) -> Iterator[Hashable]:
+        remaining, taken = state
+        piece_index = BAG.index(piece)
+
+        if taken < self.length and remaining[piece_index]:
+            yield remaining[:piece_index] + (remaining[piece_index] - 1,) + remaining[piece_index + 1 :], taken + 1
+
+    def accepts(self, state: Hashable) -> bool:
+        return state[1] == self.length
+
+class Product(Node):
+    '''
+    Concatenation of a queue from each part in order
+
+    Attributes:
+        parts (tuple[Node]): the parts in order
+    '''
+
+    def __init__(self, parts: list[Node]):
+        self.parts = tuple(parts)
+
+    def __repr__(self) -> str:
+        return f"Product({list(self.parts)!r})"
+
+    def generate(self) -> Iterator[str]:
+        return map("".join, product(*(list(part.generate()) for part in self.parts)))
+
+    def lengths(self) -> frozenset[int]:
+        lengths = frozenset((0,))
+        for part in self.parts:
+            lengths = frozenset(length + part_length for length in lengths for part_length in part.lengths())
+
+        return lengths
+
+    def count(self) -> int:
+        # queues of parts with one length each join into distinct queues
+        if all(len(part.lengths()) == 1 for part in self.parts):
+            return prod(part.count() for part in self.parts)
+
+        return super().count()
+
+    def maxCount(self) -> int:
+        return prod(part.maxCount() for part in self.parts)
+
+    def filtered(self) -> bool:
+        return any(part.filtered() for part in self.parts)
+
+    def iterSorted(self) -> Iterator[str]:
+        # a queue of the first part decides the order only when every part has one length
+        if any(len(part.lengths()) != 1 for part in self.parts):
+            return super().iterSorted()
+
+        return self._iterSortedParts(self.parts)
+
+    def matrices(self) -> dict[int, "vectorize.np.ndarray"]:
+        matrices = {0: vectorize.np.zeros((1, 0), dtype=vectorize.np.uint8)}
+
+        # join the queues of each length so far with the queues of each length of the part
+        for part in self.parts:
+            part_matrices = part.matrices()
+            new_matrices = {}
+
+            for length, matrix in matrices.items():
+                for part_length, part_matrix in part_matrices.items():
+                    new_matrices.setdefault(length + part_length, []).append(vectorize.productMatrix(matrix, part_matrix))
+
+            matrices = {length: vectorize.np.vstack(joined) for length, joined in new_matrices.items()}
+
+        return matrices
+
+    def restrict(self, prefix: str) -> Node | None:
+        if not prefix:
+            return self
+
+        # only the empty queue
+        if not self.parts:
+            return Union([])
+
+        # the prefix is split between the parts by the length of the first part
+        first_lengths = self.parts[0].lengths()
+        if len(first_lengths) != 1:
+            return None
+
+        first_length = next(iter(first_lengths))
+        if first_length >= len(prefix):
+            first = self.parts[0].restrict(prefix)
+            return None if first is None else Product([first, *self.parts[1:]])
+
+        first = self.parts[0].restrict(prefix[:first_length])
+        rest = Product(self.parts[1:]).restrict(prefix[first_length:])
+
+        return None if first is None or rest is None else Product([first, rest])
+
+    def rankable(self) -> bool:
+        return all(len(part.lengths()) == 1 and part.rankable() for part in self.parts)
+
+    def rank(self, queue: str) -> int:
+        # the queues of the parts are the digits of the index
+        index = 0
+        start = 0
+        for part in self.parts:
+            end = start + next(iter(part.lengths()))
+
+            part_index = part.rank(queue[start:end])
+            if part_index == -1:
+                return -1
+
+            index = index * part.count() + part_index
+            start = end
+
+        return index if start == len(queue) else -1
+
+    def unrank(self, index: int) -> str:
+        if not 0 <= index < self.count():
+            raise IndexError(f"Index {index} out of range of {self!r}")
+
+        queues = []
+        for part in reversed(self.parts):
+            index, part_index = divmod(index, part.count())
+            queues.append(part.unrank(part_index))
+
+        return "".join(reversed(queues))
+
+    @staticmethod
+    def _iterSortedParts(parts: tuple[Node, ...]) -> Iterator[str]:
+        '''
+        Generate the concatenations of the parts in order with each part having one length
+
+        Parameters:
+            parts (tuple[Node]): the parts left to concatenate
+
+        Return:
+            Iterator[str]: the distinct concatenations sorted the same as sort_queues
+        '''
+
+        if not parts:
+            yield ""
+            return
+
+        first, rest = parts[0], parts[1:]
+
+        # keep the queues of the rest if few enough, otherwise generate them again for each queue of the first
+        if Product(rest).maxCount() <= STREAMBUFFERSIZE:
+            rest_queues = tuple(Product._iterSortedParts(rest))
+            for queue in first.iterSorted():
+                for rest_queue in rest_queues:
+                    yield queue + rest_queue
+
+        else:
+            for queue in first.iterSorted():
+                for rest_queue in Product._iterSortedParts(rest):
+                    yield queue + rest_queue
+
+    def _closure(self, part_index: int, part_state: Hashable) -> Iterator[Hashable]:
+        '''
+        States reached from a state of a part without reading, going into the next parts when the part accepts
+
+        Parameters:
+            part_index (int): index of the part
+            part_state (Hashable): state of the part
+
+        Return:
+            Iterator[Hashable]: states of the product as the index of the part and its state
+        '''
+
+        yield part_index, part_state
+
+        if self.parts[part_index].accepts(part_state):
+            # every part read, the end of the product
+            if part_index + 1 == len(self.parts):
+                yield len(self.parts), None
+
+            else:
+                for next_state in self.parts[part_index + 1].startStates():
+                    yield from self._closure(part_index + 1, next_state)
+
+    def startStates(self) -> Iterator[Hashable]:
+        if not self.parts:
+            yield 0, None
+            return
+
+        for state in self.parts[0].startStates():
+            yield from self._closure(0, state)
+
+    def step(self, state: Hashable, piece: str) -> Iterator[Hashable]:
+        part_index, part_state = state
+        if part_index == len(self.parts):
+            return
+
+        for next_state in self.parts[part_index].step(part_state, piece):
+            yield from self._closure(part_index, next_state)
+
+    def accepts(self, state: Hashable) -> bool:
+        return state[0] == len(self.parts)
+
+class ModifierFold:
+    '''
+    Modifier tree checked from a small state kept as the pieces of a queue are read
+
+    Count modifiers keep the count of each of their pieces capped past the number compared to
+    and single piece before modifiers keep which of the two pieces came first.
+    Other modifier parts are checked on the queue read, which is only kept if there's one.
+
+    Attributes:
+        start (tuple): the state before reading any piece
+        needs_queue (bool): whether checking a state needs the queue read
+    '''
+
+    def __init__(self, parts: list[tuple[str, Any, bool]], operators: list[str]):
+        self._parts = parts
+        self._operators = operators
+        self._has_or = "||" in operators
+
+        self.start = tuple(self._startPart(part) for part in parts)
+        self.needs_queue = any(
+            kind == "raw" or (kind == "sub" and data.needs_queue) for kind, data, _ in parts
+        )
+
+    @classmethod
+    def compile(cls, modifier_tree: list) -> "ModifierFold | None":
+        '''
+        Fold a modifier tree of modifier parts joined by operators
+
+        Parameters:
+            modifier_tree (list): tree from make_modifier_tree
+
+        Return:
+            ModifierFold | None: the folded modifier or None if the tree isn't modifier parts joined by operators
+        '''
+
+        if len(modifier_tree) % 2 == 0:
+            return None
+
+        parts = []
+        operators = []
+        for i, modifier_part in enumerate(modifier_tree):
+            if i % 2 == 1:
+                if modifier_part != "&&" and modifier_part != "||":
+                    return None
+
+                operators.append(modifier_part)
+
+            elif modifier_part == "&&" or modifier_part == "||":
+                return None
+
+            else:
+                parts.append(cls._compilePart(modifier_part))
+
+        return cls(parts, operators)
+
+    @classmethod
+    def _compilePart(cls, modifier_part: str | list) -> tuple[str, Any, bool]:
+        '''Kind of the modifier part with what's needed to fold it and whether to negate'''
+
+        # checked on the queue read the same as compileModifier
+        raw = ("raw", compileModifier([modifier_part]), False)
+
+        if isinstance(modifier_part, list):
+            _, slice_indicies, negate = parsePrefixesInModifier(modifier_part[0])
+            fold = cls.compile(modifier_part[1:]) if slice_indicies is None else None
+
+            return raw if fold is None else ("sub", fold, negate)
+
+        if not isinstance(modifier_part, str):
+            return raw
+
+        modifier_part, slice_indicies, negate = parsePrefixesInModifier(modifier_part)
+
+        # the pieces read are of the whole queue
+        if slice_indicies is not None:
+            return raw
+
+        if count_match := COUNTMODIFIERREGEX.match(modifier_part):
+            count_pieces, relational_operator, num = count_match.groups()
+            num = int(num)
+
+            # allow for wildcard
+            count_parts = [(BAG if part == "*" else part, set_notation) for part, set_notation in splitSetNotation(count_pieces)]
+            pieces = sorted({piece for part, _ in count_parts for piece in part})
+
+            # counts past the number compare the same as one past it
+            return "count", ({piece: i for i, piece in enumerate(pieces)}, num + 1, count_parts, COUNTOPERATORS[relational_operator], num), negate
+
+        if before_match := BEFOREMODIFIERREGEX.match(modifier_part):
+            before_parts, after_parts = map(splitSetNotation, before_match.groups())
+
+            # a single piece before another
+            if (
+                len(before_parts) == 1 and len(after_parts) == 1
+                and len(before_parts[0][0]) == 1 and len(after_parts[0][0]) == 1
+                and before_parts[0][0] != after_parts[0][0]
+            ):
+                return "before", (before_parts[0][0], after_parts[0][0]), negate
+
+        return raw
+
+    @staticmethod
+    def _startPart(part: tuple[str, Any, bool]) -> Hashable:
+        kind, data, _ = part
+
+        if kind == "count":
+            return (0,) * len(data[0])
+        if kind == "before":
+            # 0 if neither piece was read, 1 if the before piece was first and 2 if the after piece was
+            return 0
+        if kind == "sub":
+            return data.start
+
+        return None
+
+    def step(self, state: tuple, piece: str) -> tuple:
+        '''
+        State after reading the piece
+
+        Parameters:
+            state (tuple): the current state
+            piece (str): the piece read
+
+        Return:
+            tuple: the next state
+        '''
+
+        next_state = []
+        for (kind, data, _), part_state in zip(self._parts, state):
+            if kind == "count":
+                index = data[0].get(piece)
+                if index is not None and part_state[index] < data[1]:
+                    part_state = part_state[:index] + (part_state[index] + 1,) + part_state[index + 1:]
+
+            elif kind == "before":
+                if part_state == 0:
+                    part_state = 1 if piece == data[0] else 2 if piece == data[1] else 0
+
+            elif kind == "sub":
+                part_state = data.step(part_state, piece)
+
+            next_state.append(part_state)
+
+        return tuple(next_state)
+
+    def _partPasses(self, part: tuple[str, Any, bool], part_state: Hashable, queue: str | None) -> bool:
+        kind, data, negate = part
+
+        if kind == "count":
+            index, _, count_parts, passes, num = data
+
+            # if any part is False then entire thing is False
+            for count_part, set_notation in count_parts:
+                if set_notation:
+                    if not any(passes(part_state[index[piece]], num) for piece in count_part):
+                        return negate
+
+                elif not all(passes(part_state[index[piece]], num) for piece in count_part):
+                    return negate
+
+            return not negate
+
+        if kind == "before":
+            return negate ^ (part_state == 1)
+
+        if kind == "sub":
+            return negate ^ data.check(part_state, queue)
+
+        return data(queue)
+
+    def check(self, state: tuple, queue: str | None) -> bool:
+        '''
+        Check if the queue read to reach the state is allowed by the modifier, the same as compileModifier
+
+        Parameters:
+            state (tuple): the state after reading the queue
+            queue (str | None): the queue read if needs_queue
+
+        Return:
+            bool: whether the queue is allowed
+        '''
+
+        # without any or operators the queue fails at the first modifier that fails
+        if not self._has_or:
+            return all(self._partPasses(part, part_state, queue) for part, part_state in zip(self._parts, state))
+
+        # every modifier part is checked joined by the operators in order
+        curr_bool = True
+        for i, (part, part_state) in enumerate(zip(self._parts, state)):
+            new_bool = self._partPasses(part, part_state, queue)
+
+            if i == 0 or self._operators[i - 1] == "&&":
+                curr_bool = curr_bool and new_bool
+            else:
+                curr_bool = curr_bool or new_bool
+
+        return curr_bool
+
+class Filter(Node):
+    '''
+    Queues of the child allowed by a modifier
+
+    Attributes:
+        child (Node): the node of the queues to filter
+        modifier_tree (list): the parsed modifier from make_modifier_tree
+    '''
+
+    def __init__(self, child: Node, modifier_tree: list):
+        self.child = child
+        self.modifier_tree = modifier_tree
+        self._check = compileModifier(modifier_tree)
+        self._fold = ModifierFold.compile(modifier_tree)
+        self._mask = None
+
+    def __repr__(self) -> str:
+        return f"Filter({self.child!r}, {self.modifier_tree!r})"
+
+    def generate(self) -> Iterator[str]:
+        return filter(self._check, self.child.generate())
+
+    def lengths(self) -> frozenset[int]:
+        return self.child.lengths()
+
+    def maxCount(self) -> int:
+        return self.child.maxCount()
+
+    def filtered(self) -> bool:
+        return True
+
+    def iterSorted(self) -> Iterator[str]:
+        return filter(self._check, self.child.iterSorted())
+
+    def restrict(self, prefix: str) -> Node | None:
+        # the modifier checks the whole queue so only the child is restricted
+        child = self.child.restrict(prefix)
+
+        return None if child is None else Filter(child, self.modifier_tree)
+
+    def matrices(self) -> dict[int, "vectorize.np.ndarray"]:
+        if self._mask is None:
+            self._mask = vectorize.compileModifierMask(self.modifier_tree)
+
+        return {length: matrix[self._mask(matrix)] for length, matrix in self.child.matrices().items()}
+
+    def startStates(self) -> Iterator[Hashable]:
+        # the state of the child, the folded state of the modifier and the queue read only if the modifier needs it
+        if self._fold is None:
+            fold_state, queue = None, ""
+        else:
+            fold_state, queue = self._fold.start, "" if self._fold.needs_queue else None
+
+        for state in self.child.startStates():
+            yield state, fold_state, queue
+
+    def step(self, state: Hashable, piece: str) -> Iterator[Hashable]:
+        child_state, fold_state, queue = state
+
+        if self._fold is not None:
+            fold_state = self._fold.step(fold_state, piece)
+        if queue is not None:
+            queue += piece
+
+        for next_state in self.child.step(child_state, piece):
+            yield next_state, fold_state, queue
+
+    def accepts(self, state: Hashable) -> bool:
+        child_state, fold_state, queue = state
+
+        if not self.child.accepts(child_state):
+            return False
+
+        if self._fold is None:
+            return self._check(queue)
+
+        return self._fold.check(fold_state, queue)
+
+class Union(Node):
+    '''
+    Queues of any of the parts
+
+    Attributes:
+        parts (tuple[Node]): the parts
+    '''
+
+    def __init__(self, parts: list[Node]):
+        self.parts = tuple(parts)
+
+    def __repr__(self) -> str:
+        return f"Union({list(self.parts)!r})"
+
+    def generate(self) -> Iterator[str]:
+        for part in self.parts:
+            yield from part.generate()
+
+    def lengths(self) -> frozenset[int]:
+        return frozenset().union(*(part.lengths() for part in self.parts))
+
+    def count(self) -> int:
+        # parts without a length in common can't share a queue
+        part_lengths = [part.lengths() for part in self.parts]
+        if sum(map(len, part_lengths)) == len(frozenset().union(*part_lengths)):
+            return sum(part.count() for part in self.parts)
+
+        return super().count()
+
+    def maxCount(self) -> int:
+        return sum(part.maxCount() for part in self.parts)
+
+    def filtered(self) -> bool:
+        return any(part.filtered() for part in self.parts)
+
+    def iterSorted(self) -> Iterator[str]:
+        if len(self.parts) == 1:
+            return self.parts[0].iterSorted()
+
+        return _dedupe(heapq.merge(*(part.iterSorted() for part in self.parts), key=queueKey))
+
+    def matrices(self) -> dict[int, "vectorize.np.ndarray"]:
+        matrices_by_length = {}
+        for part in self.parts:
+            for length, matrix in part.matrices().items():
+                matrices_by_length.setdefault(length, []).append(matrix)
+
+        return {length: vectorize.np.vstack(matrices) for length, matrices in matrices_by_length.items()}
+
+    def restrict(self, prefix: str) -> Node | None:
+        parts = [part.restrict(prefix) for part in self.parts]
+
+        return None if None in parts else Union(parts)
+
+    def _partsByLength(self) -> list[tuple[int, Node]]:
+        return sorted(((next(iter(part.lengths())), part) for part in self.parts), key=lambda item: item[0])
+
+    def rankable(self) -> bool:
+        # parts of one length each and no length in common are in order of length
+        part_lengths = [part.lengths() for part in self.parts]
+
+        return (
+            all(len(lengths) == 1 and part.rankable() for lengths, part in zip(part_lengths, self.parts))
+            and len(frozenset().union(*part_lengths)) == len(self.parts)
+        )
+
+    def rank(self, queue: str) -> int:
+        index = 0
+        for length, part in self._partsByLength():
+            if length == len(queue):
+                part_index = part.rank(queue)
+                return -1 if part_index == -1 else index + part_index
+
+            index += part.count()
+
+        return -1
+
+    def unrank(self, index: int) -> str:
+        if index >= 0:
+            for _, part in self._partsByLength():
+                if index < part.count():
+                    return part.unrank(index)
+
+                index -= part.count()
+
+        raise IndexError(f"Index {index} out of range of {self!r}")
+
+    def startStates(self) -> Iterator[Hashable]:
+        for part_index, part in enumerate(self.parts):
+            for state in part.startStates():
+                yield part_index, state
+
+    def step(self, state: Hashable, piece: str) -> Iterator[Hashable]:
+        part_index, part_state = state
+
+        for next_state in self.parts[part_index].step(part_state, piece):
+            yield part_index, next_state
+
+    def accepts(self, state: Hashable) -> bool:
+        part_index, part_state = state
+
+        return self.parts[part_index].accepts(part_state)
+
+class Intersection(Node):
+    '''
+    Queues of the left in the right, checked against the automaton of the right without generating it
+
+    Attributes:
+        left (Node): the node of the queues to keep from
+        right (Node): the node of the queues to keep
+    '''
+
+    def __init__(self, left: Node, right: Node):
+        self.left = left
+        self.right = right
+        self._automaton: Automaton | None = None
+
+    def __repr__(self) -> str:
+        return f"Intersection({self.left!r}, {self.right!r})"
+
+    def _rightAutomaton(self) -> Automaton:
+        if self._automaton is None:
+            self._automaton = Automaton(self.right)
+
+        return self._automaton
+
+    def _keep(self, queue: str) -> bool:
+        return self._rightAutomaton().matches(queue)
+
+    def generate(self) -> Iterator[str]:
+        return filter(self._keep, self.left.generate())
+
+    def lengths(self) -> frozenset[int]:
+        return self.left.lengths() & self.right.lengths()
+
+    def maxCount(self) -> int:
+        return min(self.left.maxCount(), self.right.maxCount())
+
+    def filtered(self) -> bool:
+        return True
+
+    def iterSorted(self) -> Iterator[str]:
+        # queues of lengths only in the left can't be in the right
+        lengths = self.right.lengths()
+
+        return filter(self._keep, (queue for queue in self.left.iterSorted() if len(queue) in lengths))
+
+    def restrict(self, prefix: str) -> Node | None:
+        left = self.left.restrict(prefix)
+        right = self.right.restrict(prefix)
+
+        return None if left is None or right is None else type(self)(left, right)
+
+    def startStates(self) -> Iterator[Hashable]:
+        # the state of the left and the deterministic state of the right
+        right_state = self._rightAutomaton().start
+        for state in self.left.startStates():
+            yield state, right_state
+
+    def step(self, state: Hashable, piece: str) -> Iterator[Hashable]:
+        left_state, right_state = state
+        right_state = self._rightAutomaton().next(right_state, piece)
+
+        for next_state in self.left.step(left_state, piece):
+            yield next_state, right_state
+
+    def accepts(self, state: Hashable) -> bool:
+        left_state, right_state = state
+
+        return self.left.accepts(left_state) and self._rightAutomaton().accepting(right_state)
+
+class Difference(Intersection):
+    '''
+    Queues of the left not in the right, checked against the automaton of the right without generating it
+
+    Attributes:
+        left (Node): the node of the queues to keep from
+        right (Node): the node of the queues to remove
+    '''
+
+    def __repr__(self) -> str:
+        return f"Difference({self.left!r}, {self.right!r})"
+
+    def _keep(self, queue: str) -> bool:
+        return not self._rightAutomaton().matches(queue)
+
+    def lengths(self) -> frozenset[int]:
+        return self.left.lengths()
+
+    def maxCount(self) -> int:
+        return self.left.maxCount()
+
+    def iterSorted(self) -> Iterator[str]:
+        return filter(self._keep, self.left.iterSorted())
+
+    def accepts(self, state: Hashable) -> bool:
+        left_state, right_state = state
+
+        return self.left.accepts(left_state) and not self._rightAutomaton().accepting(right_state)
+
+def _compilePiecesFile(filename: str) -> Node:
+    '''
+    Compile the patterns in a file with a pattern on each line, ignoring comments and empty lines
+
+    Parameters:
+        filename (str): path of the file
+
+    Return:
+        Node: union of the patterns in the file
+    '''
+
+    queue_lines = []
+    with open(filename, "r") as infile:
+
+        for line in infile:
+            # ignore comments or whitespace
+            line = line.strip()
+            if line.startswith("#") or not line:
+                continue
+
+            queue_lines.append(line)
+
+    return compilePattern(queue_lines).root
+
+def _compileSfinderPieces(pieces: str) -> Node:
+    '''
+    Compile the normal sfinder format pieces the same as parse_input
+
+    Parameters:
+        pieces (str): normal sfinder format pieces
+
+    Return:
+        Node: product of each part of the pieces
+    '''
+
+    pattern_parts: list[tuple[str, str]] = PIECESPARTREGEX.findall(pieces)
+
+    # check if there wasn't a mistake in the finding of parts
+    if "".join(map("".join, pattern_parts)) != pieces:
+        raise RuntimeError("Failed to separate input into parts")
+
+    parts = []
+    for pieces_format, permutate_format in pattern_parts:
+        # just a wildcard or a piece
+        if len(pieces_format) == 1:
+            actual_pieces = BAG if pieces_format == "*" else pieces_format
+
+        # is a set of pieces
+        elif (match_obj := PIECESSETREGEX.match(pieces_format)) is not None:
+            actual_pieces = match_obj.group(1)
+
+            if pieces_format[1] == "^":
+                actual_pieces = "".join(piece for piece in BAG if piece not in actual_pieces)
+                if actual_pieces == "":
+                    raise RuntimeError(f"Empty actual pieces from {pieces_format}")
+
+        # is a file
+        else:
+            parts.append(_compilePiecesFile(pieces_format[1:-1]))
+            continue
+
+        # determine the permutate for the pieces
+        if permutate_format == "!":
+            count = len(actual_pieces)
+        elif permutate_format:
+            count = int(permutate_format[-1])
+
+            if count > len(actual_pieces):
+                raise RuntimeError(
+                    f"{pieces} has {permutate_format}"
+                    f" even though {pieces_format} has length {len(actual_pieces)}"
+                )
+        else:
+            count = 1
+
+        parts.append(Choose(actual_pieces, count))
+
+    return Product(parts)
+
+def _compileExtendedPieces(pattern: str, index: int = 0, depth: int = 0) -> tuple[Node, int]:
+    '''
+    Compile an extended sfinder format pieces following handleExtendedSfinderFormatPieces
+
+    Parts are combined in the same order as handleExtendedSfinderFormatPieces,
+    including pieces after a modifier or parentheses going before them
+
+    Parameters:
+        pattern (str): an extended sfinder format pieces without ; or new lines
+        index (int): index of the pattern to compile from
+        depth (int): depth of the parentheses
+
+    Return:
+        tuple[Node, int]: node of the queues and the index of the closing parentheses or end of pattern
+    '''
+
+    # holds the parts separated by the delimiter
+    queues: list[Node] = []
+
+    # holds the parts since the last delimiter
+    queue_stack: list[Node] = []
+
+    sfinder_pieces = ""
+    while index < len(pattern):
+        char = pattern[index]
+
+        # delimiter
+        if char == ",":
+            if sfinder_pieces:
+                queue_stack.append(_compileSfinderPieces(sfinder_pieces))
+                sfinder_pieces = ""
+
+            queues.append(queue_stack[0] if len(queue_stack) == 1 else Product(queue_stack))
+            queue_stack = []
+
+        # sub expression
+        elif char == "(":
+            if sfinder_pieces:
+                queue_stack.append(_compileSfinderPieces(sfinder_pieces))
+                sfinder_pieces = ""
+
+            sub_node, index = _compileExtendedPieces(pattern, index + 1, depth + 1)
+            queue_stack.append(sub_node)
+
+        elif char == ")":
+            if depth == 0:
+                raise RuntimeError(f"Missing opening parentheses with '{pattern[: index + 1]}'")
+
+            if sfinder_pieces:
+                queue_stack.append(_compileSfinderPieces(sfinder_pieces))
+
+            queues.append(Product(queue_stack))
+
+            return Product(queues), index
+
+        # modifier
+        elif char == "{":
+            if sfinder_pieces:
+                queue_stack.append(_compileSfinderPieces(sfinder_pieces))
+                sfinder_pieces = ""
+
+            modifier_tree, modifier_length = make_modifier_tree(pattern[index + 1 :], return_length=True)
+
+            if index + modifier_length + 1 == len(pattern):
+                raise Exception(f"Modifier didn't close '{pattern[index:]}'")
+
+            # the modifier filters everything since the last delimiter
+            queue_stack = [Filter(Product(queue_stack), modifier_tree)]
+
+            index += modifier_length + 1
+
+        # normal sfinder pieces
+        elif char not in whitespace:
+            sfinder_pieces += char
+
+        index += 1
+
+    if depth != 0:
+        raise RuntimeError("Missing closing parentheses")
+
+    # pieces at the end go before the parts in the stack
+    if sfinder_pieces:
+        queues.append(_compileSfinderPieces(sfinder_pieces))
+
+    queues.append(Product(queue_stack))
+
+    return Product(queues), index
+
+def normalizePattern(pattern: str | list[str]) -> str:
+    '''
+    Normalize an extended pieces pattern so patterns only differing in spacing or the order of sets are the same
+
+    Whitespace is removed except in regexes of modifiers, the pieces of each set like [IT] outside
+    of modifiers and files are sorted in TILJSZO order and the patterns are joined by ;
+
+    Parameters:
+        pattern (str | list[str]): extended pieces pattern or list of them like extendPieces
+
+    Return:
+        str: the normalized pattern, with the same queues as the pattern
+    '''
+
+    if isinstance(pattern, str):
+        pattern = [pattern]
+
+    normalized_patterns = []
+    for extended_pieces in (part for p in pattern for part in PATTERNSPLITREGEX.split(p)):
+        chars = []
+        in_modifier = False
+        in_regex = False
+        in_file = False
+
+        # pieces of the set being read
+        set_pieces: list[str] | None = None
+
+        for char in extended_pieces:
+            if in_regex:
+                in_regex = char != "/"
+            elif char in whitespace:
+                continue
+            elif in_modifier:
+                in_regex = char == "/"
+                in_modifier = char != "}"
+            elif in_file:
+                in_file = char != ">"
+            elif set_pieces is not None:
+                if char != "]":
+                    set_pieces.append(char)
+                    continue
+
+                # the set is the same in any order, keeping ^ first
+                negated = set_pieces[:1] == ["^"]
+                chars.extend(["^"] * negated + sorted(set_pieces[negated:], key=BAG.find))
+                set_pieces = None
+            elif char == "[":
+                set_pieces = []
+            else:
+                in_modifier = char == "{"
+                in_file = char == "<"
+
+            chars.append(char)
+
+        # an unclosed set is kept as it was
+        if set_pieces is not None:
+            chars.extend(set_pieces)
+
+        normalized_patterns.append("".join(chars))
+
+    return ";".join(normalized_patterns)
+
+QueueCacheInfo = namedtuple("QueueCacheInfo", ["hits", "misses", "evictions", "entries", "queues", "max_queues"])
+
+class QueueCache:
+    '''
+    Least recently used cache of the queues of patterns bounded by the total number of queues
+
+    Attributes:
+        max_queues (int): most queues kept across every entry
+        hits (int): number of lookups found in the cache
+        misses (int): number of lookups computed
+        evictions (int): number of entries removed to make space
+    '''
+
+    def __init__(self, max_queues: int = QUEUECACHESIZE):
+        self.max_queues = max_queues
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[str, tuple[str, ...]] = OrderedDict()
+        self._queue_count = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, compute: Callable[[], list[str]]) -> tuple[str, ...]:
+        '''
+        Get the queues of the key, computing and storing them if not in the cache
+
+        Parameters:
+            key (str): normalized pattern
+            compute (func): function computing the queues of the pattern
+
+        Return:
+            tuple[str]: the queues
+        '''
+
+        with self._lock:
+            queues = self._entries.get(key)
+            if queues is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return queues
+
+            self.misses += 1
+
+        queues = tuple(compute())
+
+        # too many queues to keep
+        if len(queues) > self.max_queues:
+            return queues
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = queues
+                self._queue_count += len(queues)
+
+                # remove the least recently used until within the bound
+                while self._queue_count > self.max_queues:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._queue_count -= len(evicted)
+                    self.evictions += 1
+
+        return queues
+
+    def peek(self, key: str) -> tuple[str, ...] | None:
+        '''Get the queues of the key if in the cache without counting a lookup'''
+
+        with self._lock:
+            return self._entries.get(key)
+
+    def info(self) -> QueueCacheInfo:
+        '''Counts of the use and size of the cache'''
+
+        with self._lock:
+            return QueueCacheInfo(self.hits, self.misses, self.evictions, len(self._entries), self._queue_count, self.max_queues)
+
+    def clear(self) -> None:
+        '''Remove every entry and reset the counts'''
+
+        with self._lock:
+            self._entries.clear()
+            self._queue_count = 0
+            self.hits = self.misses = self.evictions = 0
+
+# cache of the queues of patterns shared by the process
+QUEUECACHE = QueueCache()
+
+class Pattern:
+    '''
+    Compiled extended pieces pattern with the same queues as extendPieces
+
+    Patterns combine lazily with & | - into patterns of the intersection, union and difference
+    of their queues, and <= checks if the queues of a pattern are all in another.
+
+    Attributes:
+        source (tuple[str]): the patterns compiled, empty for patterns combined from others
+        key (str): the normalized pattern the queues are cached under
+        root (Node): node of the queues of the patterns
+    '''
+
+    def __init__(self, source: tuple[str, ...], root: Node, key: str | None = None):
+        self.source = source
+        self.key = normalizePattern(list(source)) if key is None else key
+        self.root = root
+        self._automaton: Automaton | None = None
+
+    def __repr__(self) -> str:
+        if not self.source:
+            return f"Pattern({self.key!r})"
+
+        return f"Pattern({';'.join(self.source)!r})"
+
+    def __str__(self) -> str:
+        '''The pattern as written, or the normalized pattern for patterns combined from others'''
+
+        return ";".join(self.source) if self.source else self.key
+
+    def __and__(self, other: "Pattern | str | list[str]") -> "Pattern":
+        other = _asPattern(other)
+        if other is None:
+            return NotImplemented
+
+        return Pattern((), Intersection(self.root, other.root), f"({self.key})&({other.key})")
+
+    def __or__(self, other: "Pattern | str | list[str]") -> "Pattern":
+        other = _asPattern(other)
+        if other is None:
+            return NotImplemented
+
+        # the same as compiling the patterns together
+        if self.source and other.source:
+            return compilePattern([*self.source, *other.source])
+
+        return Pattern((), Union([self.root, other.root]), f"({self.key})|({other.key})")
+
+    def __sub__(self, other: "Pattern | str | list[str]") -> "Pattern":
+        other = _asPattern(other)
+        if other is None:
+            return NotImplemented
+
+        return Pattern((), Difference(self.root, other.root), f"({self.key})-({other.key})")
+
+    def __le__(self, other: "Pattern | str | list[str]") -> bool:
+        other = _asPattern(other)
+        if other is None:
+            return NotImplemented
+
+        # stops at the first queue not in the other
+        return all(map(other.matches, self.iterQueues()))
+
+    def _queues(self) -> tuple[str, ...]:
+        return QUEUECACHE.get(self.key, lambda: _sortedQueues(self.root))
+
+    def queues(self) -> list[str]:
+        '''
+        Get the queues of the pattern
+
+        Return:
+            list[str]: distinct queues sorted the same as extendPieces
+        '''
+
+        return list(self._queues())
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._queues())
+
+    def iterQueues(self) -> Iterator[str]:
+        '''
+        Generate the queues of the pattern without keeping them, unless they're already cached
+
+        Return:
+            Iterator[str]: distinct queues sorted the same as extendPieces
+        '''
+
+        queues = QUEUECACHE.peek(self.key)
+        if queues is not None:
+            return iter(queues)
+
+        return self.root.iterSorted()
+
+    def fingerprint(self) -> tuple[int, bytes]:
+        '''
+        Get the fingerprint of the queues of the pattern
+
+        Patterns with the same queues have the same fingerprint. Fingerprints are kept
+        after the queues are removed from the queue cache.
+
+        Return:
+            tuple[int, bytes]: number of queues and digest of the sorted queues
+        '''
+
+        if not self.source:
+            queues = self._queues()
+            return len(queues), _digest(queues)
+
+        return _fingerprint(self.key)
+
+    def iterQueuesSharded(self, workers: int | None = None, depth: int | None = None) -> Iterator[str]:
+        '''
+        Generate the queues of the pattern split into shards by their first pieces in worker processes
+
+        Each worker generates, filters and sorts the queues starting with a prefix and the shards are read in order,
+        with only a few shards for each worker generated ahead. Patterns without modifiers stream faster in this
+        process, as do patterns with queues of several lengths whose shards would all be needed at once to merge.
+
+        Parameters:
+            workers (int): number of worker processes, the number of cpus if not given
+            depth (int): number of first pieces of the prefixes, by the number of workers if not given
+
+        Return:
+            Iterator[str]: distinct queues sorted the same as extendPieces
+        '''
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if depth is None:
+            depth = 1 if workers <= SHARDDEPTHWORKERS else 2
+
+        # queues shorter than the prefixes wouldn't be in any shard
+        lengths = self.root.lengths()
+        depth = min(depth, min(lengths, default=0))
+
+        # small, unfiltered or already generated patterns aren't worth starting processes for, combined patterns have no source to send
+        if (
+            workers <= 1 or not self.source or len(lengths) != 1 or not self.root.filtered()
+            or self.root.maxCount() < SHARDMINQUEUES or QUEUECACHE.peek(self.key) is not None
+        ):
+            yield from self.iterQueues()
+            return
+
+        prefixes = list(map("".join, product(BAG, repeat=depth)))
+        if depth == 0 or any(self.root.restrict(prefix) is None for prefix in prefixes):
+            yield from self.iterQueues()
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            remaining = iter(prefixes)
+            shards = deque(
+                executor.submit(_enumerateShard, self.source, prefix)
+                for prefix in islice(remaining, workers * SHARDSPERWORKER)
+            )
+
+            # shards of queues of one length are in order of their prefixes
+            while shards:
+                shard = shards.popleft().result()
+
+                prefix = next(remaining, None)
+                if prefix is not None:
+                    shards.append(executor.submit(_enumerateShard, self.source, prefix))
+
+                yield from shard
+
+    def count(self) -> int:
+        '''Number of distinct queues of the pattern, computed without enumerating the queues outside of modifiers'''
+
+        queues = QUEUECACHE.peek(self.key)
+        if queues is not None:
+            return len(queues)
+
+        return self.root.count()
+
+    __len__ = count
+
+    def rank(self, queue: str) -> int:
+        '''
+        Index of the queue in the queues of the pattern, the index in extendPieces
+
+        Computed from the structure of the pattern if possible, otherwise searched in the queues
+
+        Parameters:
+            queue (str): a tetris format queue
+
+        Return:
+            int: index of the queue or -1 if it isn't a queue of the pattern
+        '''
+
+        if self.root.rankable():
+            return self.root.rank(queue)
+
+        # only generate the queues to search if the queue is in them
+        if not self.matches(queue):
+            return -1
+
+        queues = self._queues()
+        index = bisect.bisect_left(queues, queueKey(queue), key=queueKey)
+
+        return index if index < len(queues) and queues[index] == queue else -1
+
+    def unrank(self, index: int) -> str:
+        '''
+        Queue at the index in the queues of the pattern, the same as extendPieces(pattern)[index]
+
+        Parameters:
+            index (int): index from 0 to less than the number of queues
+
+        Return:
+            str: the queue at the index
+        '''
+
+        if self.root.rankable():
+            return self.root.unrank(index)
+
+        if index < 0:
+            raise IndexError(f"Index {index} out of range of {self!r}")
+
+        return self._queues()[index]
+
+    def automaton(self) -> Automaton:
+        '''Deterministic automaton of the pattern, built on first use'''
+
+        if self._automaton is None:
+            self._automaton = Automaton(self.root)
+
+        return self._automaton
+
+    def matches(self, queue: str) -> bool:
+        '''
+        Check if the queue is a queue of the pattern in time linear in its length
+
+        Parameters:
+            queue (str): a tetris format queue
+
+        Return:
+            bool: whether the queue is in the pattern
+        '''
+
+        return self.automaton().matches(queue)
+
+    def matchesPrefix(self, queue: str) -> bool:
+        '''
+        Check if the queue starts with a queue of the pattern in time linear in its length
+
+        Parameters:
+            queue (str): a tetris format queue
+
+        Return:
+            bool: whether the queue or a prefix of it is in the pattern
+        '''
+
+        return self.automaton().matchesPrefix(queue)
+
+    def __contains__(self, queue: object) -> bool:
+        if not isinstance(queue, str):
+            return False
+
+        return self.matches(queue)
+
+def _sortedQueues(node: Node) -> list[str]:
+    '''
+    Generate the queues of the node sorted, as numpy matrices if large enough and numpy is installed
+
+    Parameters:
+        node (Node): node of the queues
+
+    Return:
+        list[str]: distinct queues sorted the same as extendPieces
+    '''
+
+    # empty queues are left to fail in sort_queues like extendPieces
+    if vectorize.HAVENUMPY and node.maxCount() >= VECTORIZEMINQUEUES and 0 not in node.lengths():
+        return vectorize.sortedQueues(node.matrices())
+
+    return sort_queues(set(node.generate()))
+
+def _enumerateShard(source: tuple[str, ...], prefix: str) -> list[str]:
+    '''
+    Generate the sorted queues of the patterns starting with the prefix, run in a worker process
+
+    Parameters:
+        source (tuple[str]): the patterns
+        prefix (str): pieces the queues start with
+
+    Return:
+        list[str]: distinct queues with the prefix sorted the same as extendPieces
+    '''
+
+    return _sortedQueues(compilePattern(list(source)).root.restrict(prefix))
+
+@lru_cache(maxsize=FINGERPRINTCACHESIZE)
+def _fingerprint(key: str) -> tuple[int, bytes]:
+    '''
+    Get the fingerprint of the queues of a normalized pattern
+
+    Parameters:
+        key (str): normalized pattern
+
+    Return:
+        tuple[int, bytes]: number of queues and digest of the sorted queues
+    '''
+
+    queues = compilePattern(key)._queues()
+
+    return len(queues), _digest(queues)
+
+def _digest(queues: tuple[str, ...]) -> bytes:
+    '''Digest of the sorted queues of a pattern'''
+
+    return hashlib.blake2b("\n".join(queues).encode(), digest_size=16).digest()
+
+@lru_cache(maxsize=PATTERNCACHESIZE)
+def _compilePatterns(patterns: tuple[str, ...]) -> Pattern:
+    extended_pieces_patterns = []
+    for pattern in patterns:
+        extended_pieces_patterns.extend(PATTERNSPLITREGEX.split(pattern))
+
+    root = Union([_compileExtendedPieces(pattern)[0] for pattern in extended_pieces_patterns])
+
+    return Pattern(patterns, root)
+
+def _asPattern(pattern: object) -> Pattern | None:
+    '''Compile the other pattern of a set operation, None if it isn't a pattern'''
+
+    if isinstance(pattern, Pattern):
+        return pattern
+
+    if isinstance(pattern, (str, list)):
+        return compilePattern(pattern)
+
+    return None
+
+def compilePattern(pattern: str | list[str] | Pattern) -> Pattern:
+    '''
+    Compile an extended pieces pattern, reusing the compiled pattern if it was compiled before
+
+    Parameters:
+        pattern (str | list[str] | Pattern): extended pieces pattern or list of them like extendPieces
+
+    Return:
+        Pattern: the compiled pattern
+    '''
+
+    # already compiled
+    if isinstance(pattern, Pattern):
+        return pattern
+
+    if isinstance(pattern, str):
+        return _compilePatterns((pattern,))
+
+    return _compilePatterns(tuple(pattern))
+
+def countQueues(pattern: str | list[str]) -> int:
+    '''
+    Number of queues of an extended pieces pattern, the same as len(extendPieces(pattern))
+
+    Parameters:
+        pattern (str | list[str]): extended pieces pattern or list of them like extendPieces
+
+    Return:
+        int: number of distinct queues
+    '''
+
+    return compilePattern(pattern).count()
+
+def fingerprint(pattern: str | list[str]) -> tuple[int, bytes]:
+    '''
+    Fingerprint of the queues of an extended pieces pattern, equal for patterns with the same queues
+
+    Parameters:
+        pattern (str | list[str]): extended pieces pattern or list of them like extendPieces
+
+    Return:
+        tuple[int, bytes]: number of queues and digest of the sorted queues
+    '''
+
+    return compilePattern(pattern).fingerprint()
+
+def rank(pattern: str | list[str], queue: str) -> int:
+    '''
+    Index of the queue in the queues of an extended pieces pattern without generating them when possible
+
+    Parameters:
+        pattern (str | list[str]): extended pieces pattern or list of them like extendPieces
+        queue (str): a tetris format queue
+
+    Return:
+        int: index of the queue in extendPieces(pattern) or -1 if it isn't there
+    '''
+
+    return compilePattern(pattern).rank(queue)
+
+def unrank(pattern: str | list[str], index: int) -> str:
+    '''
+    Queue at the index in the queues of an extended pieces pattern without generating them when possible
+
+    Parameters:
+        pattern (str | list[str]): extended pieces pattern or list of them like extendPieces
+        index (int): index in extendPieces(pattern)
+
+    Return:
+        str: the queue at the index
+    '''
+
+    return compilePattern(pattern).unrank(index)
+
+def iterQueues(pattern: str | list[str], workers: int | None = None) -> Iterator[str]:
+    '''
+    Generate the queues of an extended pieces pattern in the order of extendPieces without keeping them
+
+    Parameters:
+        pattern (str | list[str]): extended pieces pattern or list of them like extendPieces
+        workers (int): number of worker processes to generate shards of the queues in, generated in this process if not given
+
+    Return:
+        Iterator[str]: distinct queues sorted by TILJSZO order
+    '''
+
+    if workers is not None:
+        return compilePattern(pattern).iterQueuesSharded(workers)
+
+    return compilePattern(pattern).iterQueues()
+
+def writeQueues(pattern: str | list[str], outfile: TextIO) -> int:
+    '''
+    Write the queues of an extended pieces pattern on separate lines as they're generated
+
+    Parameters:
+        pattern (str | list[str]): extended pieces pattern or list of them like extendPieces
+        outfile (TextIO): file to write to
+
+    Return:
+        int: number of queues written
+    '''
+
+    num_queues = 0
+    for queue in iterQueues(pattern):
+        # separate the queues without a new line at the end
+        if num_queues:
+            outfile.write("\n")
+        outfile.write(queue)
+
+        num_queues += 1
+
+    return num_queues
@@ -5,6 +5,8 @@ from string import whitespace
 from functools import partial
 from typing import Iterable
 import re
+import operator
+from .packed import radix_sort_queues
 
 # bag constant
 BAG = "TILJSZO"
@@ -21,19 +23,8 @@ def sort_queues(queues: Iterable[str]) -> list[str]:
         list of sorted queues
     """
 
-    piece_values: dict[str, str] = {
-        "T": "1",
-        "I": "2",
-        "L": "3",
-        "J": "4",
-        "S": "5",
-        "Z": "6",
-        "O": "7",
-    }
-
-    queue_set_values = lambda q: int("".join(piece_values[p] for p in q))
-
-    return sorted(queues, key=queue_set_values)
+    # ordered by length then TILJSZO order, the same as the packed queues
+    return radix_sort_queues(queues)
 
 
 # get the pieces from the normal sfinder format
@@ -606,6 +597,362 @@ def checkModifier(queue, modifierTree):
     return currBool
 
 
+# shapes of the modifiers and the set notation in their pieces
+SLICEPREFIXREGEX = re.compile(r"^(\d*-?\d+):(.*)$")
+COUNTMODIFIERREGEX = re.compile(r"^([\[\]TILJSZO*]+)([<>]|[<>=!]?=)(\d+)$")
+BEFOREMODIFIERREGEX = re.compile(r"^([\[\]TILJSZO*]+)<([\[\]TILJSZO*]+)$")
+REGEXMODIFIERREGEX = re.compile("/(.+)/")
+SETNOTATIONREGEX = re.compile(r"(\[[TILJSZO*]+\])")
+
+# whether a piece count passes each relational operator of the count modifier
+COUNTOPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+
+# parse the prefixes of a modifier part
+def parsePrefixesInModifier(modifierPart):
+    """
+    Parse the prefixes of a modifier part the same as handlePrefixesInModifier
+
+    Parameters:
+        modifierPart: modifier part with any prefixes
+
+    Returns:
+        the modifier part without the prefixes, the indices of the last indexing or length or None and whether to negate
+    """
+
+    hasPrefixes = bool(modifierPart)
+    sliceIndicies = None
+    negate = False
+    while hasPrefixes:
+        # the last indexing or length is used
+        if sliceMatchObj := SLICEPREFIXREGEX.match(modifierPart):
+            piecesSliceIndex, modifierPart = sliceMatchObj.groups()
+            sliceIndicies = piecesSliceIndex.split("-")
+
+            hasPrefixes = bool(modifierPart)
+
+        elif modifierPart[0] == "!":
+            negate = not negate
+            modifierPart = modifierPart[1:]
+
+            hasPrefixes = bool(modifierPart)
+
+        else:
+            hasPrefixes = False
+
+    return modifierPart, sliceIndicies, negate
+
+
+# compile the prefixes of a modifier part
+def compilePrefixesInModifier(modifierPart):
+    """
+    Compile the prefixes of a modifier part the same as handlePrefixesInModifier
+
+    Parameters:
+        modifierPart: modifier part with any prefixes
+
+    Returns:
+        the modifier part without the prefixes, a function getting the sub queue of a queue or None for the whole queue and whether to negate
+    """
+
+    modifierPart, sliceIndicies, negate = parsePrefixesInModifier(modifierPart)
+
+    if sliceIndicies is None:
+        getSubQueue = None
+
+    # an index like -3 fails when checked the same as handlePrefixesInModifier
+    elif not all(sliceIndicies):
+        getSubQueue = lambda queue: queue[int(sliceIndicies[0]) : int(sliceIndicies[1])]
+
+    elif len(sliceIndicies) == 2:
+        start, end = map(int, sliceIndicies)
+        getSubQueue = lambda queue: queue[start:end]
+
+    else:
+        end = int(sliceIndicies[0])
+        getSubQueue = lambda queue: queue[:end]
+
+    return modifierPart, getSubQueue, negate
+
+
+# split pieces of a modifier into their parts with any set notation
+def splitSetNotation(pieces):
+    """Split the pieces into parts and whether each part is in set notation"""
+
+    parts = []
+    for part in filter(None, SETNOTATIONREGEX.split(pieces)):
+        setNotation = part[0] == "[" and part[-1] == "]"
+        if setNotation:
+            part = part[1:-1]
+
+        parts.append((part, setNotation))
+
+    return parts
+
+
+# compile the count modifier
+def compileCountModifier(countPieces, relationalOperator, num, getSubQueue, negate):
+    """Compile the count modifier the same as handleCountModifier on each part"""
+
+    passes = COUNTOPERATORS[relationalOperator]
+    num = int(num)
+
+    # allow for wildcard
+    countParts = [(BAG if part == "*" else part, setNotation) for part, setNotation in splitSetNotation(countPieces)]
+
+    # count of a single piece
+    if len(countParts) == 1 and len(countParts[0][0]) == 1:
+        piece = countParts[0][0]
+
+        def countModifier(queue):
+            subQueue = queue if getSubQueue is None else getSubQueue(queue)
+
+            return negate ^ passes(subQueue.count(piece), num)
+
+        return countModifier
+
+    def countModifier(queue):
+        subQueue = queue if getSubQueue is None else getSubQueue(queue)
+
+        # if any part is False then entire thing is False
+        for part, setNotation in countParts:
+            if setNotation:
+                for piece in part:
+                    if passes(subQueue.count(piece), num):
+                        break
+                else:
+                    return negate
+
+            else:
+                for piece in part:
+                    if not passes(subQueue.count(piece), num):
+                        return negate
+
+        return not negate
+
+    return countModifier
+
+
+# check the before operator on parts of the before and after pieces
+def checkBeforeParts(beforePiecesPart, beforeSetNotation, afterPiecesPart, afterSetNotation, queue):
+    """Check the before operator the same as handleBeforeOperator with the set notation already separated"""
+
+    beforeLeft = list(beforePiecesPart)
+    afterLeft = list(afterPiecesPart)
+
+    # tries to match all the pieces in beforePieces before seeing any of the after pieces
+    for piece in queue:
+        # check if it's an after piece
+        if piece in afterLeft:
+            if not afterSetNotation:
+                return False
+
+            afterLeft.remove(piece)
+            if not afterLeft:
+                return False
+
+        # check if it's a before piece
+        elif piece in beforeLeft:
+            if beforeSetNotation:
+                return True
+
+            beforeLeft.remove(piece)
+            if not beforeLeft:
+                return True
+
+    return False
+
+
+# compile the before modifier
+def compileBeforeModifier(beforePieces, afterPieces, getSubQueue, negate):
+    """Compile the before modifier the same as handleBeforeOperator on the parts in checkModifier"""
+
+    beforePiecesParts = splitSetNotation(beforePieces)
+    afterPiecesParts = splitSetNotation(afterPieces)
+
+    # a single piece before another, the first of the two found is the before piece
+    if (
+        len(beforePiecesParts) == 1 and len(afterPiecesParts) == 1
+        and len(beforePiecesParts[0][0]) == 1 and len(afterPiecesParts[0][0]) == 1
+        and beforePiecesParts[0][0] != afterPiecesParts[0][0]
+    ):
+        beforePiece, afterPiece = beforePiecesParts[0][0], afterPiecesParts[0][0]
+
+        def beforeModifier(queue):
+            subQueue = queue if getSubQueue is None else getSubQueue(queue)
+
+            beforeIndex = subQueue.find(beforePiece)
+            if beforeIndex == -1:
+                return negate
+
+            return negate ^ (subQueue.find(afterPiece, 0, beforeIndex) == -1)
+
+        return beforeModifier
+
+    # a part on each side
+    if len(beforePiecesParts) == 1 and len(afterPiecesParts) == 1:
+        beforePart, afterPart = beforePiecesParts[0], afterPiecesParts[0]
+
+        def beforeModifier(queue):
+            subQueue = queue if getSubQueue is None else getSubQueue(queue)
+
+            return negate ^ checkBeforeParts(*beforePart, *afterPart, subQueue)
+
+        return beforeModifier
+
+    def beforeModifier(queue):
+        subQueue = queue if getSubQueue is None else getSubQueue(queue)
+
+        # the after parts are shared by the before parts, a failing pair moves on to the next before part like in checkModifier
+        afterPiecesIter = iter(afterPiecesParts)
+
+        beforeBool = True
+        for beforePiecesPart, beforeSetNotation in beforePiecesParts:
+            for afterPiecesPart, afterSetNotation in afterPiecesIter:
+                beforeBool = checkBeforeParts(beforePiecesPart, beforeSetNotation, afterPiecesPart, afterSetNotation, subQueue)
+
+                if not beforeBool:
+                    break
+
+        return negate ^ beforeBool
+
+    return beforeModifier
+
+
+# compile the regex modifier
+def compileRegexModifier(regexPattern, getSubQueue, negate):
+    """Compile the regex modifier"""
+
+    # an invalid regex fails when checked the same as checkModifier
+    try:
+        regex = re.compile(regexPattern)
+    except re.error:
+        regex = None
+
+    def regexModifier(queue):
+        subQueue = queue if getSubQueue is None else getSubQueue(queue)
+
+        if regex is None:
+            return negate ^ bool(re.search(regexPattern, subQueue))
+
+        return negate ^ bool(regex.search(subQueue))
+
+    return regexModifier
+
+
+# compile a modifier tree into a function checking queues
+def compileModifier(modifierTree):
+    """
+    Compile the modifier tree into a function checking if a queue is allowed by the modifier
+
+    The modifier is parsed once and the function gives the same result as checkModifier
+
+    Parameters:
+        modifierTree: tree from make_modifier_tree
+
+    Returns:
+        function taking a queue and returning whether it's allowed by the modifier
+    """
+
+    # operators and functions checking each modifier part with the type of modifier
+    steps = []
+    for modifierPart in modifierTree:
+        if isinstance(modifierPart, list):
+            getSubQueue, negate = compilePrefixesInModifier(modifierPart[0])[1:]
+            subModifier = compileModifier(modifierPart[1:])
+
+            steps.append((
+                "sub modifier",
+                lambda queue, getSubQueue=getSubQueue, negate=negate, subModifier=subModifier:
+                    negate ^ subModifier(queue if getSubQueue is None else getSubQueue(queue)),
+            ))
+
+        elif isinstance(modifierPart, str):
+            modifierPart, getSubQueue, negate = compilePrefixesInModifier(modifierPart)
+
+            if countModifierMatchObj := COUNTMODIFIERREGEX.match(modifierPart):
+                steps.append(("count modifier", compileCountModifier(*countModifierMatchObj.groups(), getSubQueue, negate)))
+
+            elif beforeModifierMatchObj := BEFOREMODIFIERREGEX.match(modifierPart):
+                steps.append(("before modifier", compileBeforeModifier(*beforeModifierMatchObj.groups(), getSubQueue, negate)))
+
+            elif regexModifierMatchObj := REGEXMODIFIERREGEX.match(modifierPart):
+                steps.append(("regex modifier", compileRegexModifier(regexModifierMatchObj.group(1), getSubQueue, negate)))
+
+            elif modifierPart == "&&" or modifierPart == "||":
+                steps.append((modifierPart, None))
+
+            else:
+                steps.append(("error", "Something went wrong when parsing leading to no match to modifiers or operator"))
+
+        else:
+            steps.append(("error", "Something went wrong leading to some modifier that isn't a string or list in the modifier tree"))
+
+    # without any or operators the queue fails at the first modifier that fails
+    hasOr = "||" in modifierTree
+
+    # modifiers joined by and
+    if not hasOr and all(
+        (kind == "&&") == (i % 2 == 1) and kind != "error" for i, (kind, _) in enumerate(steps)
+    ) and len(steps) % 2 == 1:
+        checks = [check for _, check in steps[::2]]
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def modifier(queue):
+            for check in checks:
+                if not check(queue):
+                    return False
+
+            return True
+
+        return modifier
+
+    def modifier(queue):
+        # holds the current boolean as parse through the modifier tree
+        currBool = True
+
+        # operator starts with and
+        operator = "&&"
+
+        for kind, check in steps:
+            if kind == "&&" or kind == "||":
+                operator = kind
+                continue
+
+            if kind == "error":
+                raise Exception(check)
+
+            # get new current boolean
+            newBool = check(queue)
+            if operator == "&&":
+                currBool = currBool and newBool
+            elif operator == "||":
+                currBool = currBool or newBool
+            else:
+                handleOperatorInModifier(currBool, newBool, operator, kind)
+
+            # all ands so can simply return False
+            if not currBool and not hasOr:
+                return False
+
+            # clear the operator
+            operator = ""
+
+        return currBool
+
+    return modifier
+
+
 # handle the whole extended sfinder pieces
 def handleExtendedSfinderFormatPieces(
     extendedSfinderFormatPieces, sortQueuesBool=True, index=0, depth=0
@@ -698,9 +1045,7 @@ def handleExtendedSfinderFormatPieces(
             queuesPart = map("".join, product(*queueStack))
 
             # filter the queues with the modifier tree
-            queuesPart = filter(
-                partial(checkModifier, modifierTree=modifierTree), queuesPart
-            )
+            queuesPart = filter(compileModifier(modifierTree), queuesPart)
 
             # set the stack with just this part
             queueStack = [queuesPart]
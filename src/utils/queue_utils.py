@@ -1,14 +1,22 @@
 # various functions related to queues
 
 import re
+from functools import lru_cache
 from typing import Callable
 from py_fumen_py import Mino
-from .pieces import extendPieces
+from .pattern import Pattern, compilePattern
+from .packed import radix_sort_queues
 from .constants import PIECESDELIMITOR
 
 # bag constant
 BAG = "TILJSZO"
 
+# splits the extended pieces of a database cell by the delimitor
+EXTENDEDPIECESSPLITREGEX = re.compile(f"(.+?{{.*?}}){PIECESDELIMITOR}|([^{{}}]+?){PIECESDELIMITOR}|(.+?)$")
+
+# number of database cells kept split and compiled
+SPLITCACHESIZE = 4096
+
 MINOVALS = {
     Mino.T: 1,
     Mino.I: 2,
@@ -36,6 +44,8 @@ MIRRORPIECES = {
     'Z': 'S',
 }
 
+MIRRORTABLE = str.maketrans(MIRRORPIECES)
+
 def MINO2PIECE(m: Mino):
     return BAG[MINOVALS[m] - 1]
 
@@ -67,12 +77,8 @@ def sort_queues(queues: list[str]) -> list[str]:
         list[str]: sorted list of queues
     '''
 
-    # create function to set value for the queue 
-    queue_val = lambda q: int(''.join(
-                        (str(PIECEVALS[p]) for p in q)
-                        ))
-
-    sorted_queues = sorted(queues, key=queue_val)
+    # ordered by length then TILJSZO order, the same as the packed queues
+    sorted_queues = radix_sort_queues(queues)
     
     return sorted_queues
 
@@ -88,14 +94,8 @@ def mirror_queue(queue: str) -> str:
 
     '''
 
-    new_queue = ""
-
-    # go through each piece and change to mirror if there is one
-    for piece in queue:
-        if piece in MIRRORPIECES:
-            new_queue += MIRRORPIECES[piece]
-        else:
-            new_queue += piece
+    # change each piece to its mirror if there is one
+    new_queue = queue.translate(MIRRORTABLE)
 
     return sort_queue(new_queue)    
 
@@ -111,25 +111,23 @@ def mirror_pattern(pattern: str) -> str:
 
     '''
 
-    new_pattern = ""
-
-    # go through each piece and change to mirror if there is one
-    for char in pattern:
-        if char in MIRRORPIECES:
-            new_pattern += MIRRORPIECES[char]
-        else:
-            new_pattern += char
+    # change each piece to its mirror if there is one
+    new_pattern = pattern.translate(MIRRORTABLE)
 
     return new_pattern
 
-def extended_pieces_equals(pattern1: str, pattern2: str, equals: Callable[[str, str], bool] = lambda x, y: x == y) -> bool:
+def extended_pieces_equals(pattern1: str | tuple[Pattern, ...],
+                           pattern2: str | tuple[Pattern, ...],
+                           equals: Callable[[str, str], bool] | None = None,
+                           verify: bool = False) -> bool:
     '''
     Check if two extended pieces are equal
 
     Parameter:
-        pattern1 (str): a extended pieces pattern
-        pattern2 (str): a extended pieces pattern
-        equals (func): compare if two queues are the same
+        pattern1 (str | tuple[Pattern]): a extended pieces pattern or its compiled parts from compile_extended_pieces
+        pattern2 (str | tuple[Pattern]): a extended pieces pattern or its compiled parts from compile_extended_pieces
+        equals (func): compare if two queues are the same, queues are compared by fingerprints if not given
+        verify (bool): whether to also compare the queues of patterns with the same fingerprint
 
     Return:
         bool: whether the two patterns are equal
@@ -140,13 +138,30 @@ def extended_pieces_equals(pattern1: str, pattern2: str, equals: Callable[[str,
         return True
 
     # if coming from the database, could separated by colons
-    pattern1_split = split_extended_pieces(pattern1)
-    pattern2_split = split_extended_pieces(pattern2)
+    pattern1_split = compile_extended_pieces(pattern1) if isinstance(pattern1, str) else pattern1
+    pattern2_split = compile_extended_pieces(pattern2) if isinstance(pattern2, str) else pattern2
 
     for pattern1_part, pattern2_part in zip(pattern1_split, pattern2_split):
+        if equals is None:
+            compiled1 = compilePattern(pattern1_part)
+            compiled2 = compilePattern(pattern2_part)
+
+            # same normalized pattern
+            if compiled1.key == compiled2.key:
+                continue
+
+            # the number of queues and their digest decide if the queues are the same
+            if compiled1.fingerprint() != compiled2.fingerprint():
+                return False
+
+            if verify and compiled1.queues() != compiled2.queues():
+                return False
+
+            continue
+
         # compute the two queues
-        queues1 = extendPieces(pattern1_part)
-        queues2 = extendPieces(pattern2_part)
+        queues1 = compilePattern(pattern1_part).queues()
+        queues2 = compilePattern(pattern2_part).queues()
 
         if len(queues1) != len(queues2):
             return False
@@ -169,52 +184,52 @@ def split_extended_pieces(pattern: str) -> list[str]:
         list: a list of extended pieces
     '''
 
-    delim = PIECESDELIMITOR
-    splitted_pattern = map("".join, re.findall(f"(.+?{{.*?}}){delim}|([^{{}}]+?){delim}|(.+?)$", pattern))
+    return list(_split_extended_pieces(pattern))
 
-    return list(splitted_pattern)
+@lru_cache(maxsize=SPLITCACHESIZE)
+def _split_extended_pieces(pattern: str) -> tuple[str, ...]:
+    return tuple(map("".join, EXTENDEDPIECESSPLITREGEX.findall(pattern)))
 
-def extended_pieces_startswith(pattern_short: str, pattern_long: str) -> bool:
+@lru_cache(maxsize=SPLITCACHESIZE)
+def compile_extended_pieces(pattern: str) -> tuple[Pattern, ...]:
+    '''
+    Split by delimitor for extended pieces found in database and compile each part
+
+    The parts of a value are only split and compiled the first time it's seen
+
+    Parameter:
+        pattern (str): a extended pieces pattern
+
+    Return:
+        tuple[Pattern]: the compiled extended pieces
+    '''
+
+    return tuple(map(compilePattern, _split_extended_pieces(pattern)))
+
+def extended_pieces_startswith(pattern_short: str | tuple[Pattern, ...], pattern_long: str | tuple[Pattern, ...]) -> bool:
     '''
     Checks if all pattern long contains queues that start with something found in pattern short
 
     Parameters:
-        pattern_short (str): the extended pieces pattern with shorter length queues
-        pattern_long (str): the extended pieces pattern with longer length queues
+        pattern_short (str | tuple[Pattern]): the extended pieces pattern with shorter length queues or its compiled parts
+        pattern_long (str | tuple[Pattern]): the extended pieces pattern with longer length queues or its compiled parts
 
     Return:
         bool: whether all the long queues start with some queue in the short queues
     '''
 
     # if coming from the database
-    pattern_short_split = split_extended_pieces(pattern_short)
-    pattern_long_split = split_extended_pieces(pattern_long)
+    pattern_short_split = compile_extended_pieces(pattern_short) if isinstance(pattern_short, str) else pattern_short
+    pattern_long_split = compile_extended_pieces(pattern_long) if isinstance(pattern_long, str) else pattern_long
 
     for short_part, long_part in zip(pattern_short_split, pattern_long_split):
-        # compute the two queues
-        short_queues = list(extendPieces(short_part))
-        long_queues = extendPieces(long_part)
-
-        # for faster speed
-        common_short_queues = []
+        # the short queues are never generated, the automaton reads each long queue once
+        short_pattern = compilePattern(short_part)
 
         # go through the long queues
-        for lq in long_queues:
-            found = False
-            for sq in common_short_queues:
-                if lq.startswith(sq):
-                    found = True
-                    break
-
-            if not found:
-                for sq in short_queues:
-                    if lq.startswith(sq):
-                        found = True
-                        common_short_queues.append(sq)
-                        break
-
+        for lq in compilePattern(long_part).iterQueues():
             # a long queue couldn't find a corresponding short queue it starts with
-            if not found:
+            if not short_pattern.matchesPrefix(lq):
                 return False
 
     return True
@@ -0,0 +1,626 @@
+# Table of rows from a database file stored by column with indexes on its columns
+
+import re
+from sys import intern
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, MutableMapping
+from functools import wraps
+from typing import Any, Callable, Iterable
+
+HEXREGEX = re.compile(r"[0-9A-F]+")
+
+class HexColumn:
+    '''
+    Column of hexadecimal strings stored as bytes
+
+    The first byte is the number of padding digits so odd lengths round trip.
+    Values that aren't uppercase hexadecimal are kept as strings.
+    '''
+
+    def __init__(self, values: Iterable = ()):
+        # encoded values shared between slots with the same value
+        self._encoded: dict[str, bytes] = {}
+        self.values: list[bytes | str | None] = [self.encode(value) for value in values]
+
+    def encode(self, value: str | None) -> bytes | str | None:
+        if not isinstance(value, str) or not HEXREGEX.fullmatch(value):
+            return value
+
+        encoded = self._encoded.get(value)
+        if encoded is None:
+            padding = len(value) % 2
+            encoded = bytes([padding]) + bytes.fromhex("0" * padding + value)
+            self._encoded[value] = encoded
+
+        return encoded
+
+    @staticmethod
+    def decode(value: bytes | str | None) -> str | None:
+        if not isinstance(value, bytes):
+            return value
+
+        return value[1:].hex().upper()[value[0]:]
+
+    def __getitem__(self, slot: int) -> str | None:
+        return self.decode(self.values[slot])
+
+    def __setitem__(self, slot: int, value: str | None) -> None:
+        self.values[slot] = self.encode(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value: str | None) -> None:
+        self.values.append(self.encode(value))
+
+    def copy(self) -> "HexColumn":
+        column = HexColumn()
+        column._encoded = self._encoded.copy()
+        column.values = self.values.copy()
+        return column
+
+FRACTIONREGEX = re.compile(r"(0|[1-9]\d{0,17})/([1-9]\d{0,17})")
+
+class FractionColumn:
+    '''
+    Column of fractions in format numerator/denominator stored as two arrays of ints
+
+    Values that aren't a fraction, such as NULL, are kept as strings
+    with -1 in the arrays.
+    '''
+
+    def __init__(self, values: Iterable = ()):
+        self.numerators = array("q")
+        self.denominators = array("q")
+        self.others: dict[int, str | None] = {}
+
+        numerators = []
+        denominators = []
+        for slot, value in enumerate(values):
+            fraction = self._split(value)
+            if fraction is None:
+                fraction = (-1, -1)
+                self.others[slot] = value
+
+            numerators.append(fraction[0])
+            denominators.append(fraction[1])
+
+        self.numerators.extend(numerators)
+        self.denominators.extend(denominators)
+
+    def _split(self, value: str | None) -> tuple[int, int] | None:
+        if not isinstance(value, str) or not (match_obj := FRACTIONREGEX.fullmatch(value)):
+            return None
+
+        return int(match_obj.group(1)), int(match_obj.group(2))
+
+    def __getitem__(self, slot: int) -> str | None:
+        numerator = self.numerators[slot]
+        if numerator < 0:
+            return self.others[slot]
+
+        return f"{numerator}/{self.denominators[slot]}"
+
+    def __setitem__(self, slot: int, value: str | None) -> None:
+        fraction = self._split(value)
+        self.others.pop(slot, None)
+
+        if fraction is None:
+            fraction = (-1, -1)
+            self.others[slot] = value
+
+        self.numerators[slot], self.denominators[slot] = fraction
+
+    def __len__(self) -> int:
+        return len(self.numerators)
+
+    def append(self, value: str | None) -> None:
+        self.numerators.append(-1)
+        self.denominators.append(-1)
+        self[len(self.numerators) - 1] = value
+
+    def copy(self) -> "FractionColumn":
+        column = FractionColumn()
+        column.numerators = array("q", self.numerators)
+        column.denominators = array("q", self.denominators)
+        column.others = self.others.copy()
+        return column
+
+# dict for column to the type storing its values, otherwise a list of interned strings
+COL2TYPE = {
+    "Cover Data": HexColumn,
+    "Solve Fraction": FractionColumn,
+}
+
+def _internValue(value: str | None) -> str | None:
+    return intern(value) if isinstance(value, str) else value
+
+class ColumnStore:
+    '''
+    Values of rows of a database file stored by column
+
+    Attributes:
+        columns (list[str]): names of the columns in order
+        data (dict): column name to the values of the column for each slot
+        versions (dict): column name to the number of times a value in the column was changed
+        size (int): number of slots
+        readonly (bool): whether changing the store raises a TypeError
+    '''
+
+    readonly = False
+
+    def __init__(self, columns: Iterable[str] = ()):
+        self.columns: list[str] = []
+        self.data: dict[str, Any] = {}
+        self.versions: dict[str, int] = {}
+        self.size = 0
+
+        for column in columns:
+            self.addColumn(column)
+
+    @classmethod
+    def fromValues(cls, columns: list[str], rows: list[list[str]]) -> "ColumnStore":
+        '''
+        Make a store from the values of each row in column order, missing values are None
+
+        Parameters:
+            columns (list[str]): names of the columns in order
+            rows (list[list] | list[tuple]): values of each row
+
+        Return:
+            ColumnStore: store of the rows
+        '''
+
+        store = cls()
+
+        # pad the rows so every row has a value for every column
+        rows = [list(values[:len(columns)]) + [None] * (len(columns) - len(values)) for values in rows]
+
+        for column, values in zip(columns, zip(*rows) if rows else [()] * len(columns)):
+            column = intern(column) if isinstance(column, str) else column
+
+            store.columns.append(column)
+            store.versions[column] = 0
+
+            if column in COL2TYPE:
+                store.data[column] = COL2TYPE[column](values)
+            else:
+                # share equal values within the column
+                shared: dict = {}
+                store.data[column] = list(map(shared.setdefault, values, values))
+
+        store.size = len(rows)
+
+        return store
+
+    def _checkWritable(self) -> None:
+        if self.readonly:
+            raise TypeError("Can't change a read only store")
+
+    def addColumn(self, column: str) -> None:
+        '''Add a column with None for the slots already in the store'''
+
+        self._checkWritable()
+
+        column = intern(column) if isinstance(column, str) else column
+
+        self.columns.append(column)
+        self.versions[column] = 0
+
+        if column in COL2TYPE:
+            self.data[column] = COL2TYPE[column]([None] * self.size)
+        else:
+            self.data[column] = [None] * self.size
+
+    def appendValues(self, values: list[str | None]) -> int:
+        '''
+        Add a slot with the values in column order, missing values are None
+
+        Return:
+            int: the slot added
+        '''
+
+        self._checkWritable()
+
+        for i, column in enumerate(self.columns):
+            value = values[i] if i < len(values) else None
+            values_column = self.data[column]
+
+            if isinstance(values_column, list):
+                value = _internValue(value)
+            values_column.append(value)
+
+        self.size += 1
+
+        return self.size - 1
+
+    def appendRow(self, row: Mapping) -> int:
+        '''
+        Add a slot with the values of the row, adding any columns not in the store
+
+        Return:
+            int: the slot added
+        '''
+
+        for column in row:
+            if column not in self.data:
+                self.addColumn(column)
+
+        return self.appendValues([row.get(column) for column in self.columns])
+
+    def get(self, slot: int, column: str) -> str | None:
+        return self.data[column][slot]
+
+    def set(self, slot: int, column: str, value: str | None) -> None:
+        self._checkWritable()
+
+        if column not in self.data:
+            self.addColumn(column)
+
+        values_column = self.data[column]
+        values_column[slot] = _internValue(value) if isinstance(values_column, list) else value
+        self.versions[column] += 1
+
+    def copy(self) -> "ColumnStore":
+        '''Copy of the store that can be changed independently, even if this store is read only'''
+
+        store = ColumnStore()
+        store.columns = self.columns.copy()
+        store.data = {column: values.copy() for column, values in self.data.items()}
+        store.versions = dict.fromkeys(self.columns, 0)
+        store.size = self.size
+
+        return store
+
+class Row(MutableMapping):
+    '''
+    View of a row in a column store that behaves as a dictionary of column to value
+
+    Setting a value writes it into the store, so every view of the row sees the change
+    '''
+
+    __slots__ = ("_store", "_slot")
+
+    def __init__(self, store: ColumnStore, slot: int):
+        self._store = store
+        self._slot = slot
+
+    def __getitem__(self, column: str) -> str | None:
+        return self._store.data[column][self._slot]
+
+    def __setitem__(self, column: str, value: str | None) -> None:
+        self._store.set(self._slot, column, value)
+
+    def __delitem__(self, column: str) -> None:
+        raise TypeError("Columns can't be removed from a row in a table")
+
+    def __iter__(self):
+        return iter(self._store.columns)
+
+    def __len__(self) -> int:
+        return len(self._store.columns)
+
+    def __contains__(self, column: object) -> bool:
+        return column in self._store.data
+
+    def __eq__(self, other: object) -> bool:
+        # same row in the same store
+        if isinstance(other, Row) and other._store is self._store and other._slot == self._slot:
+            return True
+
+        if not isinstance(other, Mapping):
+            return NotImplemented
+
+        return dict(self.items()) == dict(other.items())
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def copy(self) -> dict:
+        return dict(self.items())
+
+    def patterns(self, column: str) -> tuple:
+        '''
+        Get the compiled extended pieces of a pattern column such as Pieces or Cover Dependence
+
+        Parameters:
+            column (str): name of the column
+
+        Return:
+            tuple[Pattern]: the compiled parts of the value, shared by every row with the same value
+        '''
+
+        # imported here so reading tables doesn't load the pattern compiler
+        from .queue_utils import compile_extended_pieces
+
+        return compile_extended_pieces(self[column])
+
+class SortedIndex:
+    '''
+    Positions of the rows of a table sorted by the value in a column
+
+    Attributes:
+        keys (list): the sort key of each row in sorted order
+        positions (list[int]): position in the table of each row in sorted order
+        key (func): function that gives the sort key of a value in the column
+    '''
+
+    def __init__(self, values: list[str], key: Callable[[str], Any] | None = None):
+        self.key = key if key is not None else lambda x: x
+
+        # sort the positions by the key of the value, stable so ties keep table order
+        keyed = sorted(((self.key(value), i) for i, value in enumerate(values)), key=lambda x: x[0])
+
+        self.keys = [k for k, _ in keyed]
+        self.positions = [i for _, i in keyed]
+
+    def ranges(self, value: str, op: str) -> list[tuple[int, int]]:
+        '''
+        Get the ranges in the index where the value is satisfied by the operator
+
+        Parameters:
+            value (str): a value to compare the column to
+            op (str): a operator in {<>, >=, <=, <, >, =}
+
+        Return:
+            list: a list of start and end of ranges in the index exclusive of end
+        '''
+
+        value_key = self.key(value)
+
+        if op == "<=":
+            return [(0, bisect_right(self.keys, value_key))]
+        if op == ">=":
+            return [(bisect_left(self.keys, value_key), len(self.keys))]
+        if op == "<":
+            return [(0, bisect_left(self.keys, value_key))]
+        if op == ">":
+            return [(bisect_right(self.keys, value_key), len(self.keys))]
+        if op == "=":
+            return [(bisect_left(self.keys, value_key), bisect_right(self.keys, value_key))]
+        if op == "<>":
+            return [(0, bisect_left(self.keys, value_key)), (bisect_right(self.keys, value_key), len(self.keys))]
+
+        raise ValueError(f"Got an invalid operator for sorted index '{op}'")
+
+    def count(self, value: str, op: str) -> int:
+        '''Number of rows the value with the operator would select'''
+
+        return sum(end - start for start, end in self.ranges(value, op))
+
+    def select(self, value: str, op: str) -> list[int]:
+        '''
+        Get the positions in the table where the value is satisfied by the operator
+
+        Parameters:
+            value (str): a value to compare the column to
+            op (str): a operator in {<>, >=, <=, <, >, =}
+
+        Return:
+            list[int]: positions of the rows in table order
+        '''
+
+        positions = []
+        for start, end in self.ranges(value, op):
+            positions += self.positions[start: end]
+
+        positions.sort()
+
+        return positions
+
+def _dropsIndexes(method: Callable) -> Callable:
+    '''Wrap a list method that modifies the list to also drop the indexes'''
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._indexes.clear()
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+class Table(list):
+    '''
+    List of rows of a column store that keeps indexes on its columns
+
+    Rows added that aren't from the store of the table are copied into it,
+    so any mapping of column to value can be added.
+
+    An index on a column is built the first time it is needed and kept until
+    the list is modified or a value in the column is changed.
+    '''
+
+    def __init__(self, rows: Iterable[Mapping] = (), store: ColumnStore | None = None):
+        super().__init__()
+        self.store = store if store is not None else ColumnStore()
+        self._indexes: dict[tuple, tuple[int, Any]] = {}
+
+        list.extend(self, map(self._toRow, rows))
+
+    def __reduce__(self):
+        return (Table, (list(self), self.store))
+
+    @classmethod
+    def fromStore(cls, store: ColumnStore) -> "Table":
+        '''Table of every row in the store in slot order'''
+
+        table = cls(store=store)
+        list.extend(table, (Row(store, slot) for slot in range(store.size)))
+
+        return table
+
+    def _toRow(self, row: Mapping) -> Row:
+        '''Get the row as a row of the store of the table'''
+
+        if isinstance(row, Row):
+            # the first row decides the store of an empty table
+            if not self and self.store.size == 0 and not self.store.columns:
+                self.store = row._store
+            if row._store is self.store:
+                return row
+
+        return Row(self.store, self.store.appendRow(row))
+
+    def append(self, row: Mapping) -> None:
+        self._indexes.clear()
+        list.append(self, self._toRow(row))
+
+    def extend(self, rows: Iterable[Mapping]) -> None:
+        self._indexes.clear()
+        list.extend(self, map(self._toRow, rows))
+
+    def insert(self, index: int, row: Mapping) -> None:
+        self._indexes.clear()
+        list.insert(self, index, self._toRow(row))
+
+    def __setitem__(self, index, value) -> None:
+        self._indexes.clear()
+        if isinstance(index, slice):
+            list.__setitem__(self, index, map(self._toRow, value))
+        else:
+            list.__setitem__(self, index, self._toRow(value))
+
+    def __iadd__(self, rows: Iterable[Mapping]) -> "Table":
+        self.extend(rows)
+        return self
+
+    # modifying the list invalidates the positions in the indexes
+    pop = _dropsIndexes(list.pop)
+    remove = _dropsIndexes(list.remove)
+    clear = _dropsIndexes(list.clear)
+    sort = _dropsIndexes(list.sort)
+    reverse = _dropsIndexes(list.reverse)
+    __delitem__ = _dropsIndexes(list.__delitem__)
+    __imul__ = _dropsIndexes(list.__imul__)
+
+    def reindex(self) -> None:
+        '''Drop all the indexes so they are rebuilt with the current values'''
+
+        self._indexes.clear()
+
+    def columnValues(self, column: str) -> list[str | None]:
+        '''
+        Get the values of the column for each row in table order
+
+        Parameters:
+            column (str): name of the column
+
+        Return:
+            list: value of each row
+        '''
+
+        values_column = self.store.data.get(column)
+
+        values = []
+        for row in self:
+            if values_column is not None and row._store is self.store:
+                values.append(values_column[row._slot])
+            else:
+                values.append(row[column])
+
+        return values
+
+    def _version(self, column: str) -> int:
+        '''Number of times the column was changed in the stores of the rows'''
+
+        return self.store.versions.get(column, 0)
+
+    def hashIndex(self, column: str) -> dict[str, list[int]]:
+        '''
+        Get the index of each value in the column to the positions with that value
+
+        Parameters:
+            column (str): name of the column
+
+        Return:
+            dict: value to the positions of the rows in table order
+        '''
+
+        version, index = self._indexes.get(("hash", column), (None, None))
+
+        if index is None or version != self._version(column):
+            index = {}
+            for i, value in enumerate(self.columnValues(column)):
+                index.setdefault(value, []).append(i)
+
+            self._indexes[("hash", column)] = (self._version(column), index)
+
+        return index
+
+    def sortedIndex(self, column: str, key: Callable[[str], Any] | None = None) -> SortedIndex:
+        '''
+        Get the index of the rows sorted by the column
+
+        Parameters:
+            column (str): name of the column
+            key (func): function that gives the sort key of a value in the column
+
+        Return:
+            SortedIndex: the sorted index on the column
+        '''
+
+        version, index = self._indexes.get(("sorted", column), (None, None))
+
+        if index is None or version != self._version(column):
+            index = SortedIndex(self.columnValues(column), key)
+            self._indexes[("sorted", column)] = (self._version(column), index)
+
+        return index
+
+    def take(self, positions: Iterable[int]) -> "Table":
+        '''
+        Get a new table with the rows at the positions sharing the store of this table
+
+        Parameters:
+            positions (list[int]): positions of the rows in this table
+
+        Return:
+            Table: table of the rows
+        '''
+
+        table = Table(store=self.store)
+        list.extend(table, (self[i] for i in positions))
+
+        return table
+
+def _readOnly(method: Callable) -> Callable:
+    '''Wrap a list method that modifies the list to raise instead'''
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        raise TypeError("Can't change a read only table")
+
+    return wrapper
+
+class ReadOnlyTable(Table):
+    '''
+    Table of a read only store that can't be modified, so it can be shared with its indexes
+
+    Tables taken from it can be modified as lists but their rows stay read only.
+    '''
+
+    @classmethod
+    def fromStore(cls, store: ColumnStore) -> "ReadOnlyTable":
+        '''Read only table of every row in the store in slot order, marking the store read only'''
+
+        store.readonly = True
+
+        return super().fromStore(store)
+
+    def __reduce__(self):
+        return (ReadOnlyTable.fromStore, (self.store,))
+
+    append = _readOnly(Table.append)
+    extend = _readOnly(Table.extend)
+    insert = _readOnly(Table.insert)
+    __setitem__ = _readOnly(Table.__setitem__)
+    __iadd__ = _readOnly(Table.__iadd__)
+    pop = _readOnly(list.pop)
+    remove = _readOnly(list.remove)
+    clear = _readOnly(list.clear)
+    sort = _readOnly(list.sort)
+    reverse = _readOnly(list.reverse)
+    __delitem__ = _readOnly(list.__delitem__)
+    __imul__ = _readOnly(list.__imul__)
@@ -0,0 +1,301 @@
+# Queues as numpy matrices of piece codes for generating and filtering large patterns
+
+import re
+from typing import Callable, Iterable
+from .pieces import (
+    BAG, COUNTMODIFIERREGEX, BEFOREMODIFIERREGEX, REGEXMODIFIERREGEX, COUNTOPERATORS,
+    parsePrefixesInModifier, splitSetNotation, compileModifier,
+)
+
+# numpy is optional, patterns are expanded in python without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVENUMPY = np is not None
+
+# widest queue whose pieces fit in a 64 bit key of 3 bits per piece
+PACKEDWIDTH = 21
+
+# codes of the pieces in TILJSZO order so sorting the rows sorts the queues
+PIECECODES = {piece: code for code, piece in enumerate(BAG)}
+CODETABLE = str.maketrans({piece: chr(code) for piece, code in PIECECODES.items()})
+
+if HAVENUMPY:
+    # ascii of the piece of each code
+    PIECEASCII = np.frombuffer(BAG.encode(), dtype=np.uint8)
+
+def queuesToMatrix(queues: Iterable[str], length: int) -> "np.ndarray":
+    '''
+    Get the matrix of the queues
+
+    Parameters:
+        queues (Iterable[str]): tetris format queues with the length
+        length (int): length of the queues
+
+    Return:
+        ndarray: matrix of uint8 with a row of piece codes for each queue
+    '''
+
+    if length == 0:
+        return np.zeros((sum(1 for _ in queues), 0), dtype=np.uint8)
+
+    data = "".join(queues).translate(CODETABLE).encode()
+
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, length)
+
+def matrixToQueues(matrix: "np.ndarray") -> list[str]:
+    '''
+    Get the queues of the rows of the matrix
+
+    Parameters:
+        matrix (ndarray): matrix of piece codes
+
+    Return:
+        list[str]: the queue of each row in order
+    '''
+
+    length = matrix.shape[1]
+    if length == 0:
+        return [""] * len(matrix)
+
+    data = PIECEASCII[matrix].tobytes().decode()
+
+    return [data[i : i + length] for i in range(0, len(data), length)]
+
+def productMatrix(first: "np.ndarray", second: "np.ndarray") -> "np.ndarray":
+    '''
+    Get the matrix of every queue of first followed by a queue of second
+
+    Parameters:
+        first (ndarray): matrix of the queues going first
+        second (ndarray): matrix of the queues going second
+
+    Return:
+        ndarray: the joined queues in the order of itertools.product
+    '''
+
+    return np.hstack((
+        np.repeat(first, len(second), axis=0),
+        np.tile(second, (len(first), 1)),
+    ))
+
+def uniqueRows(matrix: "np.ndarray") -> "np.ndarray":
+    '''
+    Get the distinct rows of the matrix sorted in TILJSZO order
+
+    Parameters:
+        matrix (ndarray): matrix of piece codes
+
+    Return:
+        ndarray: the distinct rows sorted
+    '''
+
+    if matrix.shape[1] > PACKEDWIDTH:
+        return np.unique(matrix, axis=0)
+
+    # sort by a key with the pieces as digits in base 8
+    keys = np.zeros(len(matrix), dtype=np.uint64)
+    for column in matrix.T:
+        keys = (keys << np.uint64(3)) | column
+
+    return matrix[np.unique(keys, return_index=True)[1]]
+
+def sortedQueues(matrices: dict[int, "np.ndarray"]) -> list[str]:
+    '''
+    Get the distinct queues of the matrices sorted the same as sort_queues
+
+    Parameters:
+        matrices (dict): length of the queues to the matrix of the queues
+
+    Return:
+        list[str]: distinct queues sorted by length then TILJSZO order
+    '''
+
+    queues = []
+    for length in sorted(matrices):
+        queues.extend(matrixToQueues(uniqueRows(matrices[length])))
+
+    return queues
+
+def _rowwiseMask(modifierTree: list) -> Callable[["np.ndarray"], "np.ndarray"]:
+    '''Mask of the rows checked one queue at a time with the compiled modifier'''
+
+    check = compileModifier(modifierTree)
+
+    def mask(matrix):
+        return np.fromiter(map(check, matrixToQueues(matrix)), dtype=bool, count=len(matrix))
+
+    return mask
+
+def _sliceOf(sliceIndicies: list[str] | None) -> slice | None:
+    '''Slice of the columns for the indices of the prefix of a modifier part, None if they fail when checked'''
+
+    if sliceIndicies is None:
+        return slice(None)
+
+    if not all(sliceIndicies):
+        return None
+
+    if len(sliceIndicies) == 2:
+        return slice(int(sliceIndicies[0]), int(sliceIndicies[1]))
+
+    return slice(int(sliceIndicies[0]))
+
+def _pieceCount(matrix: "np.ndarray", piece: str) -> "np.ndarray":
+    if piece not in PIECECODES:
+        return np.zeros(len(matrix), dtype=np.intp)
+
+    return (matrix == PIECECODES[piece]).sum(axis=1)
+
+def _firstIndex(matrix: "np.ndarray", piece: str) -> "np.ndarray":
+    '''Index of the first of the piece in each row or the width of the matrix if missing'''
+
+    if piece not in PIECECODES or matrix.shape[1] == 0:
+        return np.full(len(matrix), matrix.shape[1])
+
+    found = matrix == PIECECODES[piece]
+
+    return np.where(found.any(axis=1), found.argmax(axis=1), matrix.shape[1])
+
+def _countMask(countPieces: str, relationalOperator: str, num: str) -> Callable[["np.ndarray"], "np.ndarray"]:
+    passes = COUNTOPERATORS[relationalOperator]
+    num = int(num)
+
+    # allow for wildcard
+    countParts = [(BAG if part == "*" else part, setNotation) for part, setNotation in splitSetNotation(countPieces)]
+
+    def mask(matrix):
+        countBool = np.ones(len(matrix), dtype=bool)
+
+        for part, setNotation in countParts:
+            if setNotation:
+                partBool = np.zeros(len(matrix), dtype=bool)
+                for piece in part:
+                    partBool |= passes(_pieceCount(matrix, piece), num)
+            else:
+                partBool = np.ones(len(matrix), dtype=bool)
+                for piece in part:
+                    partBool &= passes(_pieceCount(matrix, piece), num)
+
+            countBool &= partBool
+
+        return countBool
+
+    return mask
+
+def _beforeMask(beforePieces: str, afterPieces: str) -> Callable[["np.ndarray"], "np.ndarray"] | None:
+    beforePiecesParts = splitSetNotation(beforePieces)
+    afterPiecesParts = splitSetNotation(afterPieces)
+
+    # only a single piece before another single piece
+    if not (
+        len(beforePiecesParts) == 1 and len(afterPiecesParts) == 1
+        and not beforePiecesParts[0][1] and not afterPiecesParts[0][1]
+        and len(beforePiecesParts[0][0]) == 1 and len(afterPiecesParts[0][0]) == 1
+        and beforePiecesParts[0][0] != afterPiecesParts[0][0]
+    ):
+        return None
+
+    beforePiece, afterPiece = beforePiecesParts[0][0], afterPiecesParts[0][0]
+
+    def mask(matrix):
+        beforeIndex = _firstIndex(matrix, beforePiece)
+
+        return (beforeIndex < matrix.shape[1]) & (beforeIndex < _firstIndex(matrix, afterPiece))
+
+    return mask
+
+def _compileMask(modifierTree: list) -> Callable[["np.ndarray"], "np.ndarray"] | None:
+    '''
+    Compile a modifier tree of modifier parts joined by operators into a mask function
+
+    Return:
+        func | None: the mask function or None if checking the tree could raise an error partway through a queue
+    '''
+
+    # modifier parts joined by operators
+    masks = []
+    operators = []
+    for i, modifierPart in enumerate(modifierTree):
+        if i % 2 == 1:
+            if modifierPart != "&&" and modifierPart != "||":
+                return None
+
+            operators.append(modifierPart)
+            continue
+
+        if isinstance(modifierPart, list):
+            _, sliceIndicies, negate = parsePrefixesInModifier(modifierPart[0])
+
+            partMask = _compileMask(modifierPart[1:])
+            if partMask is None:
+                return None
+
+        elif isinstance(modifierPart, str):
+            modifierPart, sliceIndicies, negate = parsePrefixesInModifier(modifierPart)
+
+            if countModifierMatchObj := COUNTMODIFIERREGEX.match(modifierPart):
+                partMask = _countMask(*countModifierMatchObj.groups())
+
+            elif beforeModifierMatchObj := BEFOREMODIFIERREGEX.match(modifierPart):
+                partMask = _beforeMask(*beforeModifierMatchObj.groups()) or _rowwiseMask([modifierPart])
+
+            elif regexModifierMatchObj := REGEXMODIFIERREGEX.match(modifierPart):
+                # an invalid regex raises when checked
+                try:
+                    re.compile(regexModifierMatchObj.group(1))
+                except re.error:
+                    return None
+
+                partMask = _rowwiseMask([modifierPart])
+
+            else:
+                return None
+
+        else:
+            return None
+
+        columns = _sliceOf(sliceIndicies)
+        if columns is None:
+            return None
+
+        masks.append((columns, negate, partMask))
+
+    # a modifier part must end the tree
+    if modifierTree and len(modifierTree) % 2 == 0:
+        return None
+
+    def mask(matrix):
+        # holds the current boolean of each row as parse through the modifier tree
+        currBool = np.ones(len(matrix), dtype=bool)
+
+        for i, (columns, negate, partMask) in enumerate(masks):
+            newBool = partMask(matrix[:, columns]) ^ negate
+
+            if i == 0 or operators[i - 1] == "&&":
+                currBool &= newBool
+            else:
+                currBool |= newBool
+
+        return currBool
+
+    return mask
+
+def compileModifierMask(modifierTree: list) -> Callable[["np.ndarray"], "np.ndarray"]:
+    '''
+    Compile a modifier tree into a function giving the rows of a matrix allowed by the modifier
+
+    Count modifiers and single piece before modifiers are checked on the whole matrix,
+    other modifiers one queue at a time. Trees that could raise an error partway through
+    a queue are checked one queue at a time with compileModifier to raise the same errors.
+
+    Parameters:
+        modifierTree (list): tree from make_modifier_tree
+
+    Return:
+        func: function taking a matrix of queues of one length and returning a boolean mask of the rows
+    '''
+
+    return _compileMask(modifierTree) or _rowwiseMask(modifierTree)